@@ -0,0 +1,180 @@
+## accounts/activity.py
+
+import atexit
+import logging
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import LoginAttempt, UserActivity
+
+logger = logging.getLogger(__name__)
+
+# Errors a later attempt can get past (lost connection, failover, lock
+# timeout); any other error means the rows themselves are rejected.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+def write_events(events):
+    """
+    Persist a batch of recorded events with one bulk INSERT per table.
+
+    Runs in one transaction, so a failed batch can be retried whole without
+    duplicating the rows that were already inserted.
+    """
+    activities = []
+    login_attempts = []
+    for event in events:
+        if event['kind'] == 'activity':
+            activities.append(UserActivity(
+                user_id=event['user_id'],
+                activity_type=event['activity_type'],
+                details=event['details'],
+                timestamp=event['timestamp'],
+            ))
+        else:
+            login_attempts.append(LoginAttempt(
+                user_id=event['user_id'],
+                ip_address=event['ip_address'],
+                was_successful=event['was_successful'],
+                timestamp=event['timestamp'],
+            ))
+
+    batch_size = settings.ACTIVITY_BUFFER_FLUSH_SIZE
+    with transaction.atomic():
+        if activities:
+            UserActivity.objects.bulk_create(activities, batch_size=batch_size)
+        if login_attempts:
+            LoginAttempt.objects.bulk_create(login_attempts, batch_size=batch_size)
+    return len(activities) + len(login_attempts)
+
+def serialize_event(event):
+    return dict(event, timestamp=event['timestamp'].isoformat())
+
+def deserialize_event(event):
+    return dict(event, timestamp=parse_datetime(event['timestamp']))
+
+class ActivityBuffer:
+    """
+    In-process event buffer flushed by a background thread.
+
+    Flushes when ACTIVITY_BUFFER_FLUSH_SIZE events are waiting or every
+    ACTIVITY_BUFFER_FLUSH_INTERVAL seconds. A batch that fails on a
+    transient error is put back and retried on the next flush; one the
+    database rejects is written an event at a time, and the events it still
+    rejects are logged and dropped. Loss is bounded: at most
+    ACTIVITY_BUFFER_MAX_SIZE events are held, oldest dropped first, and
+    whatever is buffered when the process dies is lost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.dropped = 0
+
+    def add(self, event):
+        with self._lock:
+            if len(self._events) >= settings.ACTIVITY_BUFFER_MAX_SIZE:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(event)
+            size = len(self._events)
+            self._ensure_flusher()
+        if size >= settings.ACTIVITY_BUFFER_FLUSH_SIZE:
+            self._wakeup.set()
+
+    def drain(self):
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def requeue(self, events):
+        """
+        Put events from a failed write back in front of those recorded since, keeping the buffer bounded.
+        """
+        with self._lock:
+            self._events.extendleft(reversed(events))
+            overflow = len(self._events) - settings.ACTIVITY_BUFFER_MAX_SIZE
+            for _ in range(max(overflow, 0)):
+                self._events.popleft()
+            self.dropped += max(overflow, 0)
+
+    def flush(self):
+        events = self.drain()
+        if events:
+            try:
+                write_events(events)
+            except TRANSIENT_ERRORS:
+                self.requeue(events)
+                raise
+            except Exception:
+                self._write_singly(events)
+        return len(events)
+
+    def _write_singly(self, events):
+        # One bad event (e.g. a deleted user, or a month without a partition)
+        # fails the whole batch; retrying it as is would block every flush.
+        for position, event in enumerate(events):
+            try:
+                write_events([event])
+            except TRANSIENT_ERRORS:
+                self.requeue(events[position:])
+                raise
+            except Exception:
+                logger.exception("Dropping an activity event the database rejected: %r", event)
+                with self._lock:
+                    self.dropped += 1
+
+    def _ensure_flusher(self):
+        # Also restarts the thread in a forked worker, where it does not survive the fork.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='activity-buffer-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.ACTIVITY_BUFFER_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered activity events")
+
+buffer = ActivityBuffer()
+atexit.register(lambda: buffer.flush())
+
+def _dispatch(event):
+    mode = settings.ACTIVITY_LOG_MODE
+    if mode == 'buffered':
+        buffer.add(event)
+    elif mode == 'durable':
+        from .tasks import write_activity_events
+        write_activity_events.delay([serialize_event(event)])
+    else:
+        write_events([event])
+
+def record_activity(user, activity_type, details=None):
+    """
+    Record a UserActivity row without putting the INSERT on the request path.
+    """
+    _dispatch({
+        'kind': 'activity',
+        'user_id': user.pk,
+        'activity_type': activity_type,
+        'details': details or {},
+        'timestamp': timezone.now(),
+    })
+
+def record_login_attempt(user_id, ip_address, was_successful):
+    _dispatch({
+        'kind': 'login_attempt',
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'was_successful': was_successful,
+        'timestamp': timezone.now(),
+    })
@@ -0,0 +1,210 @@
+## accounts/archival.py
+
+import gzip
+import json
+import os
+import shutil
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.utils import timezone
+from analytics.models import AnalyticsSnapshot
+from education.models import UserProgress, UserQuizAttempt, UserQuizAnswer
+from income_streams.models import Earnings
+from .models import AccountArchive, User, UserActivity
+
+# Archived history, parents before children, with the lookup from each model to its user.
+ARCHIVED_MODELS = [
+    (Earnings, 'user_income_stream__user'),
+    (UserActivity, 'user'),
+    (AnalyticsSnapshot, 'analytics__user'),
+    (UserProgress, 'user'),
+    (UserQuizAttempt, 'user'),
+    (UserQuizAnswer, 'attempt__user'),
+]
+
+def _archive_dir(user_id):
+    return os.path.join(settings.ACCOUNT_ARCHIVE_ROOT, str(user_id))
+
+def _archive_file(directory, model):
+    return os.path.join(directory, f'{model._meta.db_table}.jsonl.gz')
+
+def _user_rows(model, lookup, user_id):
+    return model.objects.filter(**{lookup: user_id}).order_by('pk')
+
+def _export_model(model, lookup, user_id, path, batch_size):
+    columns = [field.attname for field in model._meta.concrete_fields]
+    queryset = _user_rows(model, lookup, user_id)
+    count = 0
+    last_pk = None
+    with open(path, 'wb') as raw:
+        with gzip.open(raw, 'wt', encoding='utf-8') as archive:
+            while True:
+                batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                rows = list(batch.values(*columns)[:batch_size])
+                if not rows:
+                    break
+                for row in rows:
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder))
+                    archive.write('\n')
+                count += len(rows)
+                last_pk = rows[-1][model._meta.pk.attname]
+        raw.flush()
+        os.fsync(raw.fileno())
+    return count
+
+def _archived_pk_batches(model, path, batch_size):
+    pk = model._meta.pk.attname
+    batch = []
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            batch.append(json.loads(line)[pk])
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def _purge_model(model, path, batch_size):
+    """
+    Delete exactly the rows written to the archive file, a primary-key batch at a time.
+
+    Rows written after the export (e.g. by the hourly accrual) stay in the hot
+    tables rather than being deleted unarchived. The DELETE is plain SQL so no
+    per-row signals fire and nothing cascades: archiving is not a deletion, so
+    profile totals and report versions must not move, and children are purged
+    before their parents (ARCHIVED_MODELS in reverse).
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    sql = f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN ({{}})'
+    deleted = 0
+    with connection.cursor() as cursor:
+        for ids in _archived_pk_batches(model, path, batch_size):
+            cursor.execute(sql.format(', '.join(['%s'] * len(ids))), ids)
+            deleted += cursor.rowcount
+    return deleted
+
+def archive_user(user, batch_size=None):
+    """
+    Move a deactivated user's history rows into gzipped JSON-lines files and out of the hot tables.
+
+    Files are exported and synced first. The purge then runs in one
+    transaction holding the user's row lock, so it cannot interleave with a
+    reactivation, and deletes only the rows that were exported; returns None
+    if the user was reactivated meanwhile.
+    """
+    batch_size = batch_size or settings.ACCOUNT_ARCHIVE_BATCH_SIZE
+    directory = _archive_dir(user.pk)
+    staging = directory + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    row_counts = {
+        model._meta.label: _export_model(model, lookup, user.pk, _archive_file(staging, model), batch_size)
+        for model, lookup in ARCHIVED_MODELS
+    }
+
+    with transaction.atomic():
+        locked = (
+            User.objects.select_for_update(of=('self',))
+            .filter(pk=user.pk, is_active=False, account_archive__isnull=True)
+        )
+        if not locked.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(staging, directory)
+        for model, _ in reversed(ARCHIVED_MODELS):
+            _purge_model(model, _archive_file(directory, model), batch_size)
+        return AccountArchive.objects.create(user=user, path=directory, row_counts=row_counts)
+
+def _read_rows(model, path, connection):
+    fields = model._meta.concrete_fields
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            row = json.loads(line)
+            # Columns added after the archive was written take their defaults.
+            yield [
+                field.get_db_prep_save(
+                    field.to_python(row[field.attname]) if field.attname in row else field.get_default(),
+                    connection
+                )
+                for field in fields
+            ]
+
+def _load_model(model, path, batch_size):
+    """
+    Insert the archived rows as stored, skipping rows that were never purged.
+
+    Plain INSERTs keep the archived auto_now/auto_now_add values (bulk_create
+    would stamp the current time) and fire no signals, mirroring the purge.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Archive file {path} is missing; is ACCOUNT_ARCHIVE_ROOT the storage the archive was written to?"
+        )
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    columns = [field.column for field in model._meta.concrete_fields]
+    # Stay under the smallest bound-parameter limit of the supported backends.
+    rows_per_statement = max(1, 999 // len(columns))
+    row_sql = f"({', '.join(['%s'] * len(columns))})"
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES {{}} ON CONFLICT DO NOTHING"
+    )
+    loaded = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for values in _read_rows(model, path, connection):
+            batch.append(values)
+            if len(batch) >= min(batch_size, rows_per_statement):
+                cursor.execute(sql.format(', '.join([row_sql] * len(batch))), [value for row in batch for value in row])
+                loaded += len(batch)
+                batch = []
+        if batch:
+            cursor.execute(sql.format(', '.join([row_sql] * len(batch))), [value for row in batch for value in row])
+            loaded += len(batch)
+    return loaded
+
+def restore_user(user, batch_size=None):
+    """
+    Bulk-reload an archived user's history into the hot tables and discard the archive.
+
+    Call inside the transaction that reactivates the user, holding its row lock.
+    Raises FileNotFoundError, rolling back with the archive intact, when one of
+    the archive's files cannot be found.
+    """
+    batch_size = batch_size or settings.ACCOUNT_ARCHIVE_BATCH_SIZE
+    archive = AccountArchive.objects.filter(user=user).first()
+    if archive is None:
+        return None
+
+    with transaction.atomic():
+        # Models added to ARCHIVED_MODELS after this archive was written have no file.
+        restored = {
+            model._meta.label: _load_model(model, _archive_file(archive.path, model), batch_size)
+            for model, _ in ARCHIVED_MODELS
+            if model._meta.label in archive.row_counts
+        }
+        archive.delete()
+        transaction.on_commit(lambda: shutil.rmtree(archive.path, ignore_errors=True))
+    return restored
+
+def archive_deactivated_accounts(now=None, limit=None):
+    """
+    Archive users deactivated for longer than ACCOUNT_ARCHIVE_GRACE_DAYS; returns the user ids archived.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.ACCOUNT_ARCHIVE_GRACE_DAYS)
+    users = (
+        User.objects
+        .filter(is_active=False, deactivated_at__lte=cutoff)
+        .filter(account_archive__isnull=True)
+        .order_by('deactivated_at')
+    )
+    if limit:
+        users = users[:limit]
+
+    return [user.pk for user in users if archive_user(user) is not None]
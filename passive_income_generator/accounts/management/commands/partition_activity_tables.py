@@ -0,0 +1,21 @@
+## accounts/management/commands/partition_activity_tables.py
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.partitions import PARTITIONED_MODELS, supports_partitioning, convert_to_partitioned, ensure_future_partitions
+
+class Command(BaseCommand):
+    help = "Convert UserActivity and LoginAttempt to monthly range-partitioned tables and create upcoming partitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=None, help="Monthly partitions to create beyond the current month")
+
+    def handle(self, *args, **options):
+        if not supports_partitioning():
+            raise CommandError("Table partitioning requires PostgreSQL.")
+
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            if convert_to_partitioned(model):
+                self.stdout.write(f"Converted {table} to a partitioned table.")
+            for name in ensure_future_partitions(model, options['months_ahead']):
+                self.stdout.write(f"Partition {name} ready.")
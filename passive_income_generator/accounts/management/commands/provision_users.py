@@ -0,0 +1,41 @@
+## accounts/management/commands/provision_users.py
+
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from accounts.provisioning import provision_users
+
+class Command(BaseCommand):
+    help = "Bulk-create users from a CSV (username,email,password[,risk_tolerance]) or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .csv or .jsonl file")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Users inserted per transaction")
+        parser.add_argument('--processes', type=int, default=None, help="Password hashing processes")
+        parser.add_argument('--output', default=None, help="Write per-row results as JSON Lines to this file")
+
+    def _read_rows(self, path):
+        with open(path, newline='') as f:
+            if path.endswith('.csv'):
+                return list(csv.DictReader(f))
+            return [json.loads(line) for line in f if line.strip()]
+
+    def handle(self, *args, **options):
+        try:
+            rows = self._read_rows(options['path'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {options['path']}: {exc}")
+
+        results = provision_users(rows, chunk_size=options['chunk_size'], processes=options['processes'])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                for result in results:
+                    f.write(json.dumps(result) + '\n')
+        else:
+            for result in results:
+                if result['status'] == 'error':
+                    self.stderr.write(json.dumps(result))
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        self.stdout.write(f"Created {created} of {len(rows)} users.")
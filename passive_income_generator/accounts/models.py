@@ -1,8 +1,15 @@
 ## accounts/models.py
 
+import uuid
 from django.db import models
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from datetime import timedelta
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .user_context import invalidate_user_context, invalidate_user_contexts
 
 class User(AbstractUser):
     """
@@ -11,6 +18,7 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(auto_now_add=True)
+    deactivated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.username
@@ -39,13 +47,34 @@ class Profile(models.Model):
 
     def get_total_earnings(self):
         """
-        Calculate and return the user's total earnings.
+        Return the user's running earnings total, kept current by the earnings write path.
         """
         return self.total_earnings
 
+    @classmethod
+    def add_earnings(cls, amounts_by_user):
+        """
+        Atomically add per-user amounts (negative to subtract) to the running totals in one UPDATE.
+        """
+        amounts_by_user = {user_id: amount for user_id, amount in amounts_by_user.items() if amount}
+        if not amounts_by_user:
+            return 0
+        increment = Case(
+            *[When(user_id=user_id, then=Value(amount)) for user_id, amount in amounts_by_user.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+        updated = cls.objects.filter(user_id__in=list(amounts_by_user)).update(
+            total_earnings=F('total_earnings') + increment
+        )
+        invalidate_user_contexts(amounts_by_user)
+        return updated
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+def default_next_digest_at():
+    return timezone.now() + timedelta(days=1)
+
 class UserPreferences(models.Model):
     """
     User preferences model for customizing user experience.
@@ -58,19 +87,41 @@ class UserPreferences(models.Model):
         help_text="Number of days between notifications (1-7)"
     )
     preferred_currency = models.CharField(max_length=3, default='USD')
+    next_digest_at = models.DateTimeField(default=default_next_digest_at)
+    last_digest_at = models.DateTimeField(null=True, blank=True)
+    last_digest_roi = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['receive_notifications', 'next_digest_at'], name='accounts_pref_digest_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s Preferences"
 
+    def save(self, *args, **kwargs):
+        # Keep the schedule in step with notification_frequency changes.
+        if self.last_digest_at:
+            self.next_digest_at = self.last_digest_at + timedelta(days=self.notification_frequency)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'notification_frequency' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'next_digest_at'}
+        super().save(*args, **kwargs)
+
 class LoginAttempt(models.Model):
     """
     Model to track user login attempts for security purposes.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_attempts')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField()
     was_successful = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-timestamp'], name='accounts_la_user_ts_idx'),
+        ]
+
     def __str__(self):
         return f"Login attempt for {self.user.username} at {self.timestamp}"
 
@@ -84,6 +135,11 @@ class PasswordReset(models.Model):
     expires_at = models.DateTimeField()
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='accounts_pr_expires_idx'),
+        ]
+
     def __str__(self):
         return f"Password reset for {self.user.username}"
 
@@ -93,8 +149,64 @@ class UserActivity(models.Model):
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
     activity_type = models.CharField(max_length=50)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     details = models.JSONField(default=dict)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-timestamp'], name='accounts_ua_user_ts_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.activity_type} at {self.timestamp}"
+
+class AccountArchive(models.Model):
+    """
+    Cold-storage record for a deactivated user whose history rows were moved out of the hot tables.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='account_archive')
+    path = models.CharField(max_length=255)
+    row_counts = models.JSONField(default=dict)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archive for {self.user.username} at {self.archived_at}"
+
+class UserProvisioningJob(models.Model):
+    """
+    Model tracking an asynchronous bulk user provisioning request.
+
+    Only failed rows are kept in errors; created users are counted.
+    recorded_steps lists the steps (validation, then each chunk) whose
+    results are already counted, so a redelivered task is not counted twice.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='provisioning_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField()
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list)
+    recorded_steps = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Provisioning job {self.id} ({self.status}, {self.processed_rows}/{self.total_rows})"
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_context_on_user_change(sender, instance, **kwargs):
+    invalidate_user_context(instance.pk)
+
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=UserPreferences)
+def invalidate_context_on_related_change(sender, instance, **kwargs):
+    invalidate_user_context(instance.user_id)
@@ -0,0 +1,248 @@
+## accounts/partitions.py
+
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import LoginAttempt, PasswordReset, UserActivity
+
+# Time-partitioned models and the column their PostgreSQL range partitions are keyed on.
+PARTITIONED_MODELS = {
+    UserActivity: 'timestamp',
+    LoginAttempt: 'timestamp',
+}
+
+LEGACY_SUFFIX = '_legacy'
+ARCHIVE_SCHEMA = 'archive'
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+def _month_start(day):
+    return day.replace(day=1)
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _partition_name(model, month):
+    return f'{model._meta.db_table}_p{month:%Y%m}'
+
+def _legacy_constraint_name(model):
+    return f'{model._meta.db_table}{LEGACY_SUFFIX}_before_partitions'
+
+def supports_partitioning():
+    return connection.vendor == 'postgresql'
+
+def is_partitioned(model):
+    if not supports_partitioning():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+def convert_to_partitioned(model):
+    """
+    Turn an existing plain table into a table range-partitioned by month.
+
+    The current table becomes the DEFAULT partition ('<table>_legacy') so no rows
+    are copied; retention empties it with batched deletes until it can be dropped.
+    From next month on rows go to monthly partitions, which the legacy table is
+    constrained to stay below (see _constrain_legacy). Requires PostgreSQL 12+.
+    """
+    if not supports_partitioning() or is_partitioned(model):
+        return False
+
+    table = model._meta.db_table
+    legacy = f'{table}{LEGACY_SUFFIX}'
+    column = PARTITIONED_MODELS[model]
+    pk_column = model._meta.pk.column
+    user_table = model._meta.get_field('user').related_model._meta.db_table
+    sequence = f'{table}_{pk_column}_seq'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {_quote(table)} RENAME TO {_quote(legacy)}')
+        # Index names are schema-wide; free them up for the partitioned parent.
+        for index in model._meta.indexes:
+            cursor.execute(f'ALTER INDEX {_quote(index.name)} RENAME TO {_quote(index.name + LEGACY_SUFFIX)}')
+        cursor.execute(
+            f'CREATE TABLE {_quote(table)} (LIKE {_quote(legacy)} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ({_quote(column)})'
+        )
+        cursor.execute(f'ALTER TABLE {_quote(table)} ADD PRIMARY KEY ({_quote(pk_column)}, {_quote(column)})')
+        cursor.execute(
+            f'ALTER TABLE {_quote(table)} ADD FOREIGN KEY ("user_id") '
+            f'REFERENCES {_quote(user_table)} ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+        for index in model._meta.indexes:
+            columns = ', '.join(
+                _quote(model._meta.get_field(field_name).column) + (f' {order}' if order else '')
+                for field_name, order in index.fields_orders
+            )
+            cursor.execute(f'CREATE INDEX {_quote(index.name)} ON {_quote(table)} ({columns})')
+        cursor.execute(f'ALTER SEQUENCE {_quote(sequence)} OWNED BY {_quote(table)}.{_quote(pk_column)}')
+        cursor.execute(f'ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(legacy)} DEFAULT')
+        _constrain_legacy(cursor, model, _next_month(_month_start(timezone.now().date())))
+    return True
+
+def _table_exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    return cursor.fetchone()[0] is not None
+
+def _constrain_legacy(cursor, model, upper):
+    """
+    Add a NOT VALID CHECK keeping the legacy DEFAULT partition below upper, if it has none yet.
+
+    Once validated, PostgreSQL can prove from it that a new monthly partition
+    takes no rows from the DEFAULT partition and skips scanning it under lock
+    in CREATE TABLE ... PARTITION OF. Rows for a month without a partition are
+    rejected instead of landing in the legacy table, so keep partitions created
+    ahead (ensure_future_partitions).
+    """
+    legacy = model._meta.db_table + LEGACY_SUFFIX
+    name = _legacy_constraint_name(model)
+    cursor.execute(
+        "SELECT 1 FROM pg_constraint WHERE conname = %s AND conrelid = to_regclass(%s)", [name, legacy]
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(
+            f'ALTER TABLE {_quote(legacy)} ADD CONSTRAINT {_quote(name)} '
+            f'CHECK ({_quote(PARTITIONED_MODELS[model])} < %s) NOT VALID',
+            [upper.isoformat()]
+        )
+
+def _validate_legacy_constraint(cursor, model):
+    # VALIDATE scans the legacy table once, holding only a SHARE UPDATE EXCLUSIVE
+    # lock, so writes continue; it is a no-op once the constraint is valid.
+    cursor.execute(
+        f'ALTER TABLE {_quote(model._meta.db_table + LEGACY_SUFFIX)} '
+        f'VALIDATE CONSTRAINT {_quote(_legacy_constraint_name(model))}'
+    )
+
+def ensure_future_partitions(model, months_ahead=None):
+    """
+    Create the monthly partitions for the current month and the next few.
+    """
+    if not is_partitioned(model):
+        return []
+
+    months_ahead = settings.ACTIVITY_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    table = model._meta.db_table
+    month = _month_start(timezone.now().date())
+    created = []
+    with connection.cursor() as cursor:
+        # Right after conversion the legacy DEFAULT partition already holds this month's rows,
+        # and PostgreSQL refuses a new partition overlapping them; start with next month instead.
+        has_legacy = _table_exists(cursor, table + LEGACY_SUFFIX)
+        if has_legacy and not _table_exists(cursor, _partition_name(model, month)):
+            month = _next_month(month)
+            months_ahead -= 1
+        if has_legacy:
+            # Tables converted before the constraint existed get it here, bounded by the
+            # earliest monthly partition (or the first one about to be created).
+            existing = [start for start, _ in _monthly_partitions(model)]
+            _constrain_legacy(cursor, model, min(existing + [month]))
+            _validate_legacy_constraint(cursor, model)
+        for _ in range(months_ahead + 1):
+            name = _partition_name(model, month)
+            upper = _next_month(month)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {_quote(name)} PARTITION OF {_quote(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month.isoformat(), upper.isoformat()]
+            )
+            created.append(name)
+            month = upper
+    return created
+
+def _monthly_partitions(model):
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f'{table}_p'
+    partitions = []
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        month = datetime.strptime(name[len(prefix):], '%Y%m').date()
+        partitions.append((month, name))
+    return sorted(partitions)
+
+def drop_expired_partitions(model, cutoff, archive=None):
+    """
+    Drop (or detach into the archive schema) monthly partitions entirely older than cutoff.
+    """
+    if not is_partitioned(model):
+        return []
+
+    archive = settings.ACTIVITY_PARTITION_ARCHIVE if archive is None else archive
+    table = model._meta.db_table
+    removed = []
+    with connection.cursor() as cursor:
+        for month, name in _monthly_partitions(model):
+            if _next_month(month) > cutoff.date():
+                continue
+            cursor.execute(f'ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}')
+            if archive:
+                cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {_quote(ARCHIVE_SCHEMA)}')
+                cursor.execute(f'ALTER TABLE {_quote(name)} SET SCHEMA {_quote(ARCHIVE_SCHEMA)}')
+            else:
+                cursor.execute(f'DROP TABLE {_quote(name)}')
+            removed.append(name)
+    return removed
+
+def purge_in_batches(queryset, batch_size=None):
+    """
+    Delete the queryset's rows a primary-key batch at a time to keep locks and WAL bursts short.
+
+    Batches walk the primary key upwards from where the previous one stopped,
+    so the filter needs no index of its own and the table is read once in
+    total rather than from the start for every batch.
+    """
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    model = queryset.model
+    deleted = 0
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        ids = list(batch.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        last_pk = ids[-1]
+        deleted += model.objects.filter(pk__in=ids).delete()[0]
+
+def enforce_retention(now=None):
+    """
+    Apply retention to activity logs and password reset tokens.
+
+    Returns a summary of partitions removed and rows purged per table.
+    """
+    now = now or timezone.now()
+    retention_days = {
+        UserActivity: settings.USER_ACTIVITY_RETENTION_DAYS,
+        LoginAttempt: settings.LOGIN_ATTEMPT_RETENTION_DAYS,
+    }
+
+    summary = {}
+    for model, column in PARTITIONED_MODELS.items():
+        cutoff = now - timedelta(days=retention_days[model])
+        ensure_future_partitions(model)
+        removed = drop_expired_partitions(model, cutoff)
+        # Covers non-partitioned backends and rows still sitting in the legacy DEFAULT partition.
+        purged = purge_in_batches(model.objects.filter(**{f'{column}__lt': cutoff}))
+        summary[model._meta.db_table] = {'partitions_removed': removed, 'rows_purged': purged}
+
+    expired_resets = PasswordReset.objects.filter(Q(expires_at__lt=now) | Q(is_used=True))
+    summary[PasswordReset._meta.db_table] = {'rows_purged': purge_in_batches(expired_resets)}
+    return summary
@@ -0,0 +1,331 @@
+## accounts/provisioning.py
+
+import base64
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import django
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from analytics.models import Analytics
+from .activity import TRANSIENT_ERRORS
+from .models import Profile, UserPreferences, UserProvisioningJob
+
+User = get_user_model()
+
+RISK_TOLERANCES = {choice for choice, _ in Profile.RISK_TOLERANCE_CHOICES}
+
+# A job's rows rejected by validation are recorded as step 0; chunk n of the
+# valid rows is recorded as step n.
+VALIDATION_STEP = 0
+
+def _init_hash_worker():
+    # No-op under fork; needed when the pool uses the spawn start method.
+    django.setup()
+
+def _hash_processes(processes=None):
+    return processes or settings.PROVISIONING_HASH_PROCESSES or os.cpu_count() or 1
+
+def hash_passwords(passwords, pool=None):
+    """
+    Hash passwords, across a process pool when given one; hashing is CPU-bound and deliberately slow.
+    """
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    # Each hash takes a few hundred milliseconds, so small chunks keep workers evenly loaded.
+    return list(pool.map(make_password, passwords, chunksize=16))
+
+def _validate_row(row):
+    errors = {}
+    username = (row.get('username') or '').strip()
+    email = (row.get('email') or '').strip()
+    if not username:
+        errors['username'] = 'This field is required.'
+    elif len(username) > User._meta.get_field('username').max_length:
+        errors['username'] = 'Ensure this field has no more than 150 characters.'
+    if not email:
+        errors['email'] = 'This field is required.'
+    else:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors['email'] = 'Enter a valid email address.'
+    if not row.get('password'):
+        errors['password'] = 'This field is required.'
+    elif not errors:
+        # AUTH_PASSWORD_VALIDATORS, with the row's own attributes for the similarity check.
+        try:
+            validate_password(row['password'], user=User(username=username, email=email))
+        except ValidationError as exc:
+            errors['password'] = ' '.join(exc.messages)
+    if row.get('risk_tolerance') and row['risk_tolerance'] not in RISK_TOLERANCES:
+        errors['risk_tolerance'] = f"Must be one of: {', '.join(sorted(RISK_TOLERANCES))}."
+    return username, email, errors
+
+def _find_conflicts(indexed_rows):
+    usernames = {row['username'] for _, row in indexed_rows}
+    emails = {row['email'] for _, row in indexed_rows}
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+
+    conflicts = {}
+    for index, row in indexed_rows:
+        errors = {}
+        if row['username'] in taken_usernames:
+            errors['username'] = 'A user with that username already exists.'
+        if row['email'] in taken_emails:
+            errors['email'] = 'A user with that email already exists.'
+        if errors:
+            conflicts[index] = errors
+    return conflicts
+
+def _create_chunk(indexed_rows, password_hashes):
+    """
+    Insert one chunk of users with their profile, preferences and analytics rows in a transaction.
+    """
+    users = [
+        User(username=row['username'], email=row['email'], password=password_hashes[index], is_active=True)
+        for index, row in indexed_rows
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return ids from a bulk insert.
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+
+        Profile.objects.bulk_create([
+            Profile(user=user, risk_tolerance=row.get('risk_tolerance') or 'medium')
+            for user, (_, row) in zip(users, indexed_rows)
+        ])
+        UserPreferences.objects.bulk_create([UserPreferences(user=user) for user in users])
+        Analytics.objects.bulk_create([Analytics(user=user) for user in users])
+    return users
+
+def validate_rows(rows):
+    """
+    Check every row and the batch for duplicates without touching the database.
+
+    Returns (results, valid): results holds an error result at the index of
+    each rejected row and None elsewhere; valid lists (index, cleaned row)
+    pairs still to be created.
+    """
+    results = [None] * len(rows)
+    valid = []
+    seen_usernames = set()
+    seen_emails = set()
+
+    for index, row in enumerate(rows):
+        username, email, errors = _validate_row(row)
+        if not errors:
+            if username in seen_usernames:
+                errors['username'] = 'Duplicate username in this batch.'
+            if email in seen_emails:
+                errors['email'] = 'Duplicate email in this batch.'
+        if errors:
+            results[index] = {'index': index, 'username': username, 'status': 'error', 'errors': errors}
+            continue
+        seen_usernames.add(username)
+        seen_emails.add(email)
+        valid.append((index, dict(row, username=username, email=email)))
+    return results, valid
+
+def provision_users(rows, chunk_size=None, processes=None):
+    """
+    Create users in bulk and return one result dict per input row, in input order.
+
+    Each result has 'index', 'username' and 'status' ('created' with 'id', or
+    'error' with 'errors'). Invalid rows and rows clashing with existing users
+    or with earlier rows in the batch are reported, not created. Hashing forks
+    a process pool, so call this from a command, not a web or Celery worker.
+    """
+    chunk_size = chunk_size or settings.PROVISIONING_CHUNK_SIZE
+    results, valid = validate_rows(rows)
+    processes = _hash_processes(processes)
+    pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_hash_worker) if processes > 1 and valid else None
+    try:
+        provision_valid_rows(valid, results, chunk_size, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+def provision_valid_rows(valid, results, chunk_size, pool=None, hashes=None):
+    """
+    Create validated (index, row) pairs a chunk per transaction, storing each row's result in results[index].
+
+    hashes optionally maps row indexes to password hashes computed beforehand.
+    """
+    precomputed = hashes
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        hashes = precomputed
+        for attempt in range(2):
+            conflicts = _find_conflicts(chunk)
+            for index, row in chunk:
+                if index in conflicts:
+                    results[index] = {'index': index, 'username': row['username'], 'status': 'error',
+                                      'errors': conflicts[index]}
+            chunk = [(index, row) for index, row in chunk if index not in conflicts]
+            if not chunk:
+                break
+
+            if hashes is None:
+                hashes = dict(zip(
+                    (index for index, _ in chunk),
+                    hash_passwords([row['password'] for _, row in chunk], pool)
+                ))
+            try:
+                users = _create_chunk(chunk, hashes)
+            except IntegrityError:
+                # A concurrent signup took a username or email after the check; re-check once.
+                if attempt == 0:
+                    continue
+                for index, row in chunk:
+                    results[index] = {'index': index, 'username': row['username'], 'status': 'error',
+                                      'errors': {'non_field_errors': 'Could not create user.'}}
+                break
+
+            for (index, row), user in zip(chunk, users):
+                results[index] = {'index': index, 'username': row['username'], 'status': 'created', 'id': user.pk}
+            break
+
+def _payload_cipher():
+    key = salted_hmac('accounts.provisioning.payload', 'key', algorithm='sha256').digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+def seal_payload(rows):
+    """
+    Encrypt rows (which carry plaintext passwords) for a task message.
+    """
+    return _payload_cipher().encrypt(json.dumps(rows).encode()).decode()
+
+def open_payload(token):
+    """
+    Decrypt a sealed payload; it expires with the job, so a late redelivery cannot be replayed.
+    """
+    return json.loads(_payload_cipher().decrypt(token.encode(), ttl=settings.PROVISIONING_JOB_TIMEOUT))
+
+def start_provisioning_job(rows, requested_by):
+    """
+    Queue rows for provisioning by Celery workers and return the job tracking them.
+    """
+    from .tasks import run_provisioning_job
+
+    job = UserProvisioningJob.objects.create(requested_by=requested_by, total_rows=len(rows))
+    # Passwords are never stored on the job, and only reach the broker encrypted.
+    payload = seal_payload(rows)
+    transaction.on_commit(lambda: run_provisioning_job.delay(str(job.id), payload))
+    return job
+
+def _lock_job(job_id):
+    return UserProvisioningJob.objects.select_for_update().get(pk=job_id)
+
+def _record_results(job, step, results):
+    """
+    Add one step's row results to a locked job, completing it once every row is accounted for.
+    """
+    errors = [result for result in results if result['status'] == 'error']
+    job.recorded_steps.append(step)
+    job.processed_rows += len(results)
+    job.created_count += len(results) - len(errors)
+    job.errors.extend(errors)
+    if job.processed_rows >= job.total_rows:
+        job.status = 'completed'
+        job.errors.sort(key=lambda result: result['index'])
+        job.completed_at = timezone.now()
+    job.save(update_fields=['recorded_steps', 'processed_rows', 'created_count', 'errors', 'status', 'completed_at'])
+
+def _fail_job(job_id, error):
+    UserProvisioningJob.objects.filter(pk=job_id, status__in=['pending', 'running']).update(
+        status='failed', error=error, completed_at=timezone.now()
+    )
+
+def prepare_provisioning_job(job_id, payload, chunk_size=None):
+    """
+    Validate a job's rows, record the rejected ones and return the valid rows as [(step, sealed chunk)].
+
+    Each chunk is hashed and inserted by its own task, so the job spreads
+    across however many Celery workers are free. Safe to run again for a
+    running job (e.g. after a redelivery): validation is only recorded once,
+    and chunks that were already recorded are skipped by their tasks.
+    """
+    chunk_size = chunk_size or settings.PROVISIONING_CHUNK_SIZE
+    try:
+        results, valid = validate_rows(open_payload(payload))
+    except Exception as exc:
+        _fail_job(job_id, str(exc) or type(exc).__name__)
+        raise
+    with transaction.atomic():
+        job = _lock_job(job_id)
+        if job.status == 'pending':
+            job.status = 'running'
+            _record_results(job, VALIDATION_STEP, [result for result in results if result is not None])
+        elif job.status != 'running':
+            return []
+    return [
+        (VALIDATION_STEP + 1 + start // chunk_size, seal_payload(valid[start:start + chunk_size]))
+        for start in range(0, len(valid), chunk_size)
+    ]
+
+def provision_job_chunk(job_id, step, payload):
+    """
+    Create one chunk of a job's validated rows and record the results in the same transaction.
+
+    A chunk whose step is already recorded, or whose job is no longer
+    running, is skipped, so redelivered or duplicated tasks create nothing.
+    Returns the job's processed row count.
+    """
+    job = UserProvisioningJob.objects.only('status', 'recorded_steps', 'processed_rows').get(pk=job_id)
+    if job.status != 'running' or step in job.recorded_steps:
+        return job.processed_rows
+    chunk = [(index, row) for index, row in open_payload(payload)]
+    # Hashed before the job is locked, so chunks only queue up for their inserts.
+    hashes = dict(zip((index for index, _ in chunk), hash_passwords([row['password'] for _, row in chunk])))
+
+    try:
+        with transaction.atomic():
+            job = _lock_job(job_id)
+            if job.status != 'running' or step in job.recorded_steps:
+                return job.processed_rows
+            results = {}
+            provision_valid_rows(chunk, results, len(chunk), hashes=hashes)
+            _record_results(job, step, list(results.values()))
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception:
+        # Nothing from the chunk was committed; account for its rows so the job still completes.
+        with transaction.atomic():
+            job = _lock_job(job_id)
+            if job.status == 'running' and step not in job.recorded_steps:
+                _record_results(job, step, [
+                    {'index': index, 'username': row['username'], 'status': 'error',
+                     'errors': {'non_field_errors': 'Could not create user.'}}
+                    for index, row in chunk
+                ])
+        raise
+    return job.processed_rows
+
+def fail_stalled_provisioning_jobs(now=None):
+    """
+    Fail jobs still unfinished PROVISIONING_JOB_TIMEOUT seconds after they were queued.
+
+    Covers workers lost mid-job after their retries ran out; the job's sealed
+    payloads have expired by then, so no late task can still create users.
+    Returns the number of jobs failed.
+    """
+    now = now or timezone.now()
+    return UserProvisioningJob.objects.filter(
+        status__in=['pending', 'running'],
+        created_at__lt=now - timedelta(seconds=settings.PROVISIONING_JOB_TIMEOUT),
+    ).update(status='failed', error='Timed out before every row was processed.', completed_at=now)
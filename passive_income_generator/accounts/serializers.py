@@ -1,8 +1,15 @@
 ## accounts/serializers.py
 
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from .models import Profile, UserPreferences, LoginAttempt, PasswordReset, UserActivity
+from django.conf import settings
+from django.db import transaction
+from .models import Profile, UserPreferences, LoginAttempt, PasswordReset, UserActivity, UserProvisioningJob
+from .token_denylist import is_revoked, revoke_token
 
 User = get_user_model()
 
@@ -28,10 +35,10 @@ class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['id', 'user', 'risk_tolerance', 'total_earnings']
+        read_only_fields = ['total_earnings']
 
     def update(self, instance, validated_data):
         instance.risk_tolerance = validated_data.get('risk_tolerance', instance.risk_tolerance)
-        instance.total_earnings = validated_data.get('total_earnings', instance.total_earnings)
         instance.save()
         return instance
 
@@ -39,6 +46,7 @@ class UserPreferencesSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserPreferences
         fields = ['id', 'user', 'receive_notifications', 'notification_frequency', 'preferred_currency']
+        read_only_fields = ['user']
 
 class LoginAttemptSerializer(serializers.ModelSerializer):
     class Meta:
@@ -85,28 +93,79 @@ class ChangePasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError("New passwords do not match.")
         return data
 
+def save_changed_fields(instance, data):
+    """
+    Assign the values that differ from the instance and save only those columns.
+    """
+    changed = [field for field, value in data.items() if getattr(instance, field) != value]
+    for field in changed:
+        setattr(instance, field, data[field])
+    if changed:
+        instance.save(update_fields=changed)
+    return changed
+
 class UserProfileSerializer(serializers.ModelSerializer):
-    profile = ProfileSerializer()
-    preferences = UserPreferencesSerializer()
+    profile = ProfileSerializer(required=False)
+    preferences = UserPreferencesSerializer(required=False)
 
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'profile', 'preferences']
 
     def update(self, instance, validated_data):
+        """
+        Apply user, profile and preferences changes in one transaction.
+
+        Nested data has already been validated with the outer serializer, so
+        invalid input is reported instead of dropped. self.changed_fields lists
+        the columns written per object.
+        """
         profile_data = validated_data.pop('profile', {})
         preferences_data = validated_data.pop('preferences', {})
 
-        instance = super().update(instance, validated_data)
+        with transaction.atomic():
+            self.changed_fields = {
+                'user': save_changed_fields(instance, validated_data),
+                'profile': save_changed_fields(instance.profile, profile_data) if profile_data else [],
+                'preferences': save_changed_fields(instance.preferences, preferences_data) if preferences_data else [],
+            }
+        return instance
 
-        if profile_data:
-            profile_serializer = ProfileSerializer(instance.profile, data=profile_data, partial=True)
-            if profile_serializer.is_valid():
-                profile_serializer.save()
+class BulkUserProvisionSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
 
-        if preferences_data:
-            preferences_serializer = UserPreferencesSerializer(instance.preferences, data=preferences_data, partial=True)
-            if preferences_serializer.is_valid():
-                preferences_serializer.save()
+    def validate_users(self, value):
+        max_rows = settings.PROVISIONING_MAX_ROWS_PER_REQUEST
+        if len(value) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} users can be provisioned per request.")
+        return value
 
-        return instance
+class UserProvisioningJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserProvisioningJob
+        fields = ['id', 'status', 'total_rows', 'processed_rows', 'created_count', 'errors', 'error',
+                  'created_at', 'completed_at']
+        read_only_fields = fields
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+
+class DenylistTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that rejects revoked refresh tokens and revokes the old one on rotation.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if is_revoked(refresh):
+            raise TokenError('Token is revoked')
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            revoke_token(refresh)
+        return data
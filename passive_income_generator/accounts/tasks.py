@@ -0,0 +1,64 @@
+## accounts/tasks.py
+
+from celery import shared_task
+from .activity import TRANSIENT_ERRORS, write_events, deserialize_event
+from .partitions import enforce_retention
+from .archival import archive_deactivated_accounts as archive_accounts
+from .provisioning import fail_stalled_provisioning_jobs as fail_stalled_jobs, prepare_provisioning_job, provision_job_chunk
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=10, acks_late=True)
+def write_activity_events(self, events):
+    """
+    Persist activity and login-attempt events published in durable logging mode.
+
+    Only transient errors are retried; events the database rejects fail the task.
+    """
+    try:
+        return write_events([deserialize_event(event) for event in events])
+    except TRANSIENT_ERRORS as exc:
+        raise self.retry(exc=exc)
+
+@shared_task
+def enforce_activity_retention():
+    """
+    Roll activity-log partitions forward, expire old ones and purge spent password reset tokens.
+    """
+    return enforce_retention()
+
+@shared_task
+def archive_deactivated_accounts():
+    """
+    Move the history of accounts deactivated past the grace period into cold storage.
+    """
+    return archive_accounts()
+
+# Late acks redeliver a task whose worker died; both steps are safe to repeat.
+@shared_task(bind=True, max_retries=5, default_retry_delay=10, acks_late=True, reject_on_worker_lost=True)
+def run_provisioning_job(self, job_id, payload):
+    """
+    Validate a bulk provisioning job's rows and fan the valid ones out to one task per chunk.
+    """
+    try:
+        chunks = prepare_provisioning_job(job_id, payload)
+    except TRANSIENT_ERRORS as exc:
+        raise self.retry(exc=exc)
+    for step, chunk in chunks:
+        provision_user_chunk.delay(job_id, step, chunk)
+    return len(chunks)
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=10, acks_late=True, reject_on_worker_lost=True)
+def provision_user_chunk(self, job_id, step, payload):
+    """
+    Hash and insert one chunk of a provisioning job's users.
+    """
+    try:
+        return provision_job_chunk(job_id, step, payload)
+    except TRANSIENT_ERRORS as exc:
+        raise self.retry(exc=exc)
+
+@shared_task
+def fail_stalled_provisioning_jobs():
+    """
+    Fail bulk provisioning jobs that outlived PROVISIONING_JOB_TIMEOUT.
+    """
+    return fail_stalled_jobs()
@@ -0,0 +1,146 @@
+## accounts/throttling.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+class InMemoryWindowStore:
+    """
+    Per-process counters for the current and previous fixed window of each key.
+
+    Holds at most max_keys keys; the least recently used key is evicted first.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key, window_index):
+        entry = self._data.get(key)
+        if entry is None:
+            entry = [window_index, 0, 0]
+            self._data[key] = entry
+            if len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+            if entry[0] != window_index:
+                # Roll forward: the old current window becomes "previous" only if it is adjacent.
+                entry[2] = entry[1] if entry[0] == window_index - 1 else 0
+                entry[1] = 0
+                entry[0] = window_index
+        return entry
+
+    def increment(self, key, window_index, window):
+        with self._lock:
+            entry = self._entry(key, window_index)
+            entry[1] += 1
+            return entry[1], entry[2]
+
+    def get(self, key, window_index):
+        with self._lock:
+            entry = self._entry(key, window_index)
+            return entry[1], entry[2]
+
+class CacheWindowStore:
+    """
+    Window counters kept in the shared Django cache, so limits hold across processes.
+    """
+
+    def _key(self, key, window_index):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return f'throttle:{digest}:{window_index}'
+
+    def increment(self, key, window_index, window):
+        current_key = self._key(key, window_index)
+        cache.add(current_key, 0, timeout=window * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr(); start the window over.
+            cache.set(current_key, 1, timeout=window * 2)
+            current = 1
+        previous = cache.get(self._key(key, window_index - 1), 0)
+        return current, previous
+
+    def get(self, key, window_index):
+        current_key = self._key(key, window_index)
+        previous_key = self._key(key, window_index - 1)
+        values = cache.get_many([current_key, previous_key])
+        return values.get(current_key, 0), values.get(previous_key, 0)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.LOGIN_THROTTLE_BACKEND == 'cache':
+                    _store = CacheWindowStore()
+                else:
+                    _store = InMemoryWindowStore(settings.LOGIN_THROTTLE_MAX_KEYS)
+    return _store
+
+class SlidingWindowCounter:
+    """
+    Sliding-window rate limit approximated from two fixed windows.
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window, which avoids the burst-at-the-boundary problem of a
+    plain fixed window while storing only two integers per key.
+    """
+
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def _position(self, now):
+        window_index = int(now // self.window)
+        elapsed_fraction = (now % self.window) / self.window
+        return window_index, elapsed_fraction
+
+    def _estimate(self, current, previous, elapsed_fraction):
+        return current + previous * (1 - elapsed_fraction)
+
+    def is_limited(self, key):
+        window_index, elapsed_fraction = self._position(time.time())
+        current, previous = get_store().get(f'{self.scope}:{key}', window_index)
+        return self._estimate(current, previous, elapsed_fraction) >= self.limit
+
+    def hit(self, key):
+        now = time.time()
+        window_index, elapsed_fraction = self._position(now)
+        current, previous = get_store().increment(f'{self.scope}:{key}', window_index, self.window)
+        return self._estimate(current, previous, elapsed_fraction) > self.limit
+
+    def wait(self):
+        now = time.time()
+        return self.window - (now % self.window)
+
+def ip_counter():
+    return SlidingWindowCounter('login-ip', settings.LOGIN_THROTTLE_IP_LIMIT, settings.LOGIN_THROTTLE_IP_WINDOW)
+
+def username_failure_counter():
+    return SlidingWindowCounter(
+        'login-username', settings.LOGIN_THROTTLE_USERNAME_LIMIT, settings.LOGIN_THROTTLE_USERNAME_WINDOW
+    )
+
+class LoginIPThrottle(BaseThrottle):
+    """
+    Counts every login attempt per client IP and rejects callers over the limit.
+    """
+
+    def allow_request(self, request, view):
+        self.counter = ip_counter()
+        return not self.counter.hit(self.get_ident(request))
+
+    def wait(self):
+        return self.counter.wait()
@@ -0,0 +1,84 @@
+## accounts/token_denylist.py
+
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+def _compact(jti):
+    # simplejwt issues uuid4().hex ids; 16 raw bytes instead of a 32-character string.
+    try:
+        return bytes.fromhex(jti)
+    except ValueError:
+        return jti
+
+class InMemoryDenylist:
+    """
+    Per-process set of revoked token ids, each kept only until the token expires.
+
+    Expired entries are swept when the set grows past max_size; if it is still
+    full afterwards the entries closest to expiry are dropped first.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._entries[_compact(jti)] = int(expires_at)
+            if len(self._entries) > self.max_size:
+                self._sweep()
+
+    def contains(self, jti):
+        with self._lock:
+            expires_at = self._entries.get(_compact(jti))
+        return expires_at is not None and expires_at > time.time()
+
+    def _sweep(self):
+        now = time.time()
+        self._entries = {key: expires_at for key, expires_at in self._entries.items() if expires_at > now}
+        overflow = len(self._entries) - self.max_size
+        if overflow > 0:
+            for key, _ in sorted(self._entries.items(), key=lambda item: item[1])[:overflow]:
+                del self._entries[key]
+
+class CacheDenylist:
+    """
+    Revoked token ids kept in the shared Django cache, so revocation holds across processes.
+    """
+
+    def _key(self, jti):
+        return f'jwt-denylist:{jti}'
+
+    def add(self, jti, expires_at):
+        timeout = int(expires_at - time.time())
+        if timeout > 0:
+            cache.set(self._key(jti), 1, timeout)
+
+    def contains(self, jti):
+        return cache.get(self._key(jti)) is not None
+
+_denylist = None
+_denylist_lock = threading.Lock()
+
+def get_denylist():
+    global _denylist
+    if _denylist is None:
+        with _denylist_lock:
+            if _denylist is None:
+                if settings.JWT_DENYLIST_BACKEND == 'cache':
+                    _denylist = CacheDenylist()
+                else:
+                    _denylist = InMemoryDenylist(settings.JWT_DENYLIST_MAX_SIZE)
+    return _denylist
+
+def revoke_token(token):
+    """
+    Deny further use of a validated token until it would have expired anyway.
+    """
+    get_denylist().add(token['jti'], token['exp'])
+
+def is_revoked(token):
+    return get_denylist().contains(token['jti'])
@@ -0,0 +1,40 @@
+## accounts/user_context.py
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+USER_CONTEXT_CACHE_KEY = 'user-context:{user_id}'
+
+def user_context_cache_key(user_id):
+    return USER_CONTEXT_CACHE_KEY.format(user_id=user_id)
+
+def load_user_context(user_id):
+    """
+    Load the user together with its profile and preferences in one joined query.
+
+    Missing one-to-one rows are remembered as absent, so accessing them later
+    raises DoesNotExist without another query. Analytics is left out: its
+    data_version is bumped with queryset UPDATEs on every earnings and
+    investment write, which would leave a cached copy stale. Every other write
+    to the bundled rows goes through save() or a path that invalidates the
+    bundle itself (see Profile.add_earnings).
+    """
+    return get_user_model().objects.select_related('profile', 'preferences').get(pk=user_id)
+
+def get_user_context(user_id, timeout):
+    """
+    Return the cached user bundle, loading and caching it for timeout seconds on a miss.
+    """
+    key = user_context_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = load_user_context(user_id)
+        if timeout > 0:
+            cache.set(key, user, timeout)
+    return user
+
+def invalidate_user_context(user_id):
+    cache.delete(user_context_cache_key(user_id))
+
+def invalidate_user_contexts(user_ids):
+    cache.delete_many([user_context_cache_key(user_id) for user_id in user_ids])
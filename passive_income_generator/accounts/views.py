@@ -1,74 +1,172 @@
 ## accounts/views.py
 
 from django.contrib.auth import get_user_model, authenticate, login, logout
+from django.contrib.auth.models import update_last_login
+from django.db import transaction
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import Throttled
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Profile, UserPreferences, LoginAttempt, PasswordReset, UserActivity
+from rest_framework_simplejwt.views import TokenRefreshView
+from .models import LoginAttempt, PasswordReset, UserActivity, UserProvisioningJob
+from .activity import record_activity, record_login_attempt
+from .throttling import LoginIPThrottle, username_failure_counter
 from .serializers import (
     UserSerializer, ProfileSerializer, UserPreferencesSerializer,
     LoginAttemptSerializer, PasswordResetSerializer, UserActivitySerializer,
-    UserRegistrationSerializer, ChangePasswordSerializer, UserProfileSerializer
+    UserRegistrationSerializer, ChangePasswordSerializer, UserProfileSerializer,
+    BulkUserProvisionSerializer, UserProvisioningJobSerializer, LogoutSerializer, DenylistTokenRefreshSerializer
 )
-from django.core.mail import send_mail
+from .provisioning import start_provisioning_job
+from .archival import restore_user
+from .token_denylist import revoke_token
+from notifications.mail import queue_email
 from django.conf import settings
+import hashlib
+import json
 import secrets
 from datetime import timedelta
 
 User = get_user_model()
 
+def _uses_sessions():
+    return settings.API_AUTH_MODE == 'session'
+
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
 
     def perform_create(self, serializer):
+        # The serializer already creates the profile and preferences rows.
         user = serializer.save()
-        Profile.objects.create(user=user)
-        UserPreferences.objects.create(user=user)
-        UserActivity.objects.create(user=user, activity_type='registration')
+        record_activity(user, 'registration')
+
+class BulkUserProvisionView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkUserProvisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Hashing thousands of passwords takes minutes; Celery workers do it and the job reports progress.
+        job = start_provisioning_job(serializer.validated_data['users'], request.user)
+        return Response(UserProvisioningJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class UserProvisioningJobView(generics.RetrieveAPIView):
+    serializer_class = UserProvisioningJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = UserProvisioningJob.objects.all()
 
 class UserLoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginIPThrottle]
 
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
+
+        # Reject usernames under attack before paying for the password hash.
+        failures = username_failure_counter()
+        if username and failures.is_limited(username):
+            raise Throttled(wait=failures.wait())
+
         user = authenticate(username=username, password=password)
 
         if user:
-            login(request, user)
+            if _uses_sessions():
+                login(request, user)
+            elif jwt_settings.UPDATE_LAST_LOGIN:
+                update_last_login(None, user)
             refresh = RefreshToken.for_user(user)
-            LoginAttempt.objects.create(user=user, ip_address=request.META.get('REMOTE_ADDR'), was_successful=True)
-            UserActivity.objects.create(user=user, activity_type='login')
+            record_login_attempt(user.pk, request.META.get('REMOTE_ADDR'), was_successful=True)
+            record_activity(user, 'login')
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
             })
         else:
-            LoginAttempt.objects.create(user=User.objects.get(username=username), ip_address=request.META.get('REMOTE_ADDR'), was_successful=False)
+            if username:
+                failures.hit(username)
+                user_id = User.objects.filter(username=username).values_list('pk', flat=True).first()
+                if user_id is not None:
+                    record_login_attempt(user_id, request.META.get('REMOTE_ADDR'), was_successful=False)
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 class UserLogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        logout(request)
-        UserActivity.objects.create(user=request.user, activity_type='logout')
+        serializer = LogoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        refresh = serializer.validated_data.get('refresh')
+        if refresh is not None:
+            revoke_token(refresh)
+        user = request.user
+        if _uses_sessions():
+            logout(request)
+        record_activity(user, 'logout')
         return Response(status=status.HTTP_200_OK)
 
+class DenylistTokenRefreshView(TokenRefreshView):
+    serializer_class = DenylistTokenRefreshSerializer
+
+def _etag(data):
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode('utf-8')
+    return quote_etag(hashlib.md5(payload).hexdigest())
+
+def _etag_matches(etag, header):
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
+    """
+    The "me" resource: the user with profile and preferences, read in one query.
+
+    Responses carry an ETag. If-None-Match on a read returns 304 when nothing
+    changed; a stale If-Match on an update returns 412.
+    """
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_object(self):
-        return self.request.user
-
-    def perform_update(self, serializer):
-        serializer.save()
-        UserActivity.objects.create(user=self.request.user, activity_type='profile_update')
+    def get_object(self, for_update=False):
+        queryset = User.objects.select_related('profile', 'preferences')
+        if for_update:
+            # profile and preferences are LEFT OUTER JOINed, which PostgreSQL cannot lock;
+            # the user row alone serialises concurrent updates of the "me" resource.
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset.get(pk=self.request.user.pk)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_serializer(self.get_object()).data
+        etag = _etag(data)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if _etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        with transaction.atomic():
+            instance = self.get_object(for_update=True)
+            if_match = request.META.get('HTTP_IF_MATCH')
+            if if_match and not _etag_matches(_etag(self.get_serializer(instance).data), if_match):
+                return Response({'error': 'Profile has changed since it was read.'},
+                                status=status.HTTP_412_PRECONDITION_FAILED)
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        changed = {name: fields for name, fields in serializer.changed_fields.items() if fields}
+        if changed:
+            record_activity(request.user, 'profile_update', {'changed': changed})
+        data = serializer.data
+        return Response(data, headers={'ETag': _etag(data), 'Cache-Control': 'private, no-cache'})
 
 class ChangePasswordView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -80,7 +178,7 @@ class ChangePasswordView(APIView):
             if user.check_password(serializer.data.get('old_password')):
                 user.set_password(serializer.data.get('new_password'))
                 user.save()
-                UserActivity.objects.create(user=user, activity_type='password_change')
+                record_activity(user, 'password_change')
                 return Response({'message': 'Password changed successfully.'}, status=status.HTTP_200_OK)
             return Response({'error': 'Incorrect old password.'}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -100,15 +198,13 @@ class PasswordResetRequestView(APIView):
         PasswordReset.objects.create(user=user, token=token, expires_at=expires_at)
 
         reset_url = f"{settings.FRONTEND_URL}/reset-password/{token}"
-        send_mail(
+        queue_email(
             'Password Reset Request',
             f'Click the following link to reset your password: {reset_url}',
-            settings.DEFAULT_FROM_EMAIL,
             [email],
-            fail_silently=False,
         )
 
-        UserActivity.objects.create(user=user, activity_type='password_reset_request')
+        record_activity(user, 'password_reset_request')
         return Response({'message': 'Password reset link sent to your email.'}, status=status.HTTP_200_OK)
 
 class PasswordResetConfirmView(APIView):
@@ -130,7 +226,7 @@ class PasswordResetConfirmView(APIView):
         reset_request.is_used = True
         reset_request.save()
 
-        UserActivity.objects.create(user=user, activity_type='password_reset_confirm')
+        record_activity(user, 'password_reset_confirm')
         return Response({'message': 'Password reset successful.'}, status=status.HTTP_200_OK)
 
 class UserPreferencesView(generics.RetrieveUpdateAPIView):
@@ -142,7 +238,7 @@ class UserPreferencesView(generics.RetrieveUpdateAPIView):
 
     def perform_update(self, serializer):
         serializer.save()
-        UserActivity.objects.create(user=self.request.user, activity_type='preferences_update')
+        record_activity(self.request.user, 'preferences_update')
 
 class UserActivityListView(generics.ListAPIView):
     serializer_class = UserActivitySerializer
@@ -164,9 +260,11 @@ class DeactivateAccountView(APIView):
     def post(self, request):
         user = request.user
         user.is_active = False
-        user.save()
-        logout(request)
-        UserActivity.objects.create(user=user, activity_type='account_deactivation')
+        user.deactivated_at = timezone.now()
+        user.save(update_fields=['is_active', 'deactivated_at'])
+        if _uses_sessions():
+            logout(request)
+        record_activity(user, 'account_deactivation')
         return Response({'message': 'Account deactivated successfully.'}, status=status.HTTP_200_OK)
 
 class ReactivateAccountView(APIView):
@@ -174,12 +272,15 @@ class ReactivateAccountView(APIView):
 
     def post(self, request):
         email = request.data.get('email')
-        try:
-            user = User.objects.get(email=email, is_active=False)
-        except User.DoesNotExist:
-            return Response({'error': 'No inactive account found with this email.'}, status=status.HTTP_404_NOT_FOUND)
-
-        user.is_active = True
-        user.save()
-        UserActivity.objects.create(user=user, activity_type='account_reactivation')
+        with transaction.atomic():
+            try:
+                user = User.objects.select_for_update().get(email=email, is_active=False)
+            except User.DoesNotExist:
+                return Response({'error': 'No inactive account found with this email.'}, status=status.HTTP_404_NOT_FOUND)
+
+            user.is_active = True
+            user.deactivated_at = None
+            user.save(update_fields=['is_active', 'deactivated_at'])
+            restore_user(user)
+        record_activity(user, 'account_reactivation')
         return Response({'message': 'Account reactivated successfully.'}, status=status.HTTP_200_OK)
@@ -1,8 +1,15 @@
 ## analytics/models.py
 
-from django.db import models
+import uuid
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Mod
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.conf import settings
-from income_streams.models import UserIncomeStream
+from django.utils import timezone
+from income_streams.models import UserIncomeStream, Earnings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 class Analytics(models.Model):
@@ -14,15 +21,20 @@ class Analytics(models.Model):
     total_investments = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, validators=[MinValueValidator(0)])
     total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, validators=[MinValueValidator(0)])
     overall_roi = models.DecimalField(max_digits=5, decimal_places=2, default=0.00, validators=[MinValueValidator(0), MaxValueValidator(100)])
+    data_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped whenever the user's investments or earnings change; keys cached reports"
+    )
 
     def __str__(self):
         return f"Analytics for {self.user.username}"
 
     def generate_report(self):
-        # Update total investments and earnings
-        user_income_streams = UserIncomeStream.objects.filter(user=self.user)
-        self.total_investments = sum(stream.invested_amount for stream in user_income_streams)
-        self.total_earnings = sum(stream.earnings.aggregate(models.Sum('amount'))['amount__sum'] or 0 for stream in user_income_streams)
+        # Update total investments and earnings with one aggregate each
+        self.total_investments = UserIncomeStream.objects.filter(user_id=self.user_id).aggregate(
+            total=Sum('invested_amount'))['total'] or 0
+        self.total_earnings = Earnings.objects.filter(user_income_stream__user_id=self.user_id).aggregate(
+            total=Sum('amount'))['total'] or 0
 
         # Calculate overall ROI
         if self.total_investments > 0:
@@ -30,8 +42,16 @@ class Analytics(models.Model):
         else:
             self.overall_roi = 0
 
-        self.last_report_date = models.DateTimeField(auto_now=True)
-        self.save()
+        self.last_report_date = timezone.now()
+        # Never write data_version back: it may have been bumped while the report was built.
+        self.save(update_fields=['total_investments', 'total_earnings', 'overall_roi', 'last_report_date'])
+
+    @classmethod
+    def bump_data_version(cls, **filters):
+        """
+        Invalidate cached reports for the matching users with a single UPDATE.
+        """
+        return cls.objects.filter(**filters).update(data_version=F('data_version') + 1)
 
     def calculate_roi(self):
         if self.total_investments > 0:
@@ -115,6 +135,67 @@ class IncomeStreamAnalytics(models.Model):
             self.roi = 0
         self.save()
 
+    @classmethod
+    def bulk_refresh(cls, user_ids=None, shard_index=None, shard_count=None, batch_size=1000):
+        """
+        Recompute total earnings and ROI for every position of the given users (or shard of users).
+
+        Each batch of positions costs one grouped aggregate plus bulk writes,
+        and missing Analytics/IncomeStreamAnalytics rows are created.
+        Returns the number of positions refreshed.
+        """
+        positions = UserIncomeStream.objects.all()
+        if user_ids is not None:
+            positions = positions.filter(user_id__in=user_ids)
+        if shard_count:
+            positions = positions.annotate(shard=Mod('user_id', shard_count)).filter(shard=shard_index)
+        positions = positions.annotate(earned=Sum('earnings__amount')).order_by('id')
+
+        refreshed = 0
+        last_id = 0
+        while True:
+            batch = list(positions.filter(id__gt=last_id).values_list('id', 'user_id', 'invested_amount', 'earned')[:batch_size])
+            if not batch:
+                return refreshed
+            last_id = batch[-1][0]
+            cls._upsert_batch(batch)
+            refreshed += len(batch)
+
+    @classmethod
+    def _upsert_batch(cls, batch):
+        user_ids = {user_id for _, user_id, _, _ in batch}
+        analytics_ids = dict(Analytics.objects.filter(user_id__in=user_ids).values_list('user_id', 'id'))
+        missing = user_ids - analytics_ids.keys()
+        if missing:
+            Analytics.objects.bulk_create([Analytics(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+            analytics_ids.update(Analytics.objects.filter(user_id__in=missing).values_list('user_id', 'id'))
+
+        existing = dict(cls.objects.filter(
+            user_income_stream_id__in=[position_id for position_id, _, _, _ in batch]
+        ).values_list('user_income_stream_id', 'id'))
+
+        now = timezone.now()
+        to_update = []
+        to_create = []
+        for position_id, user_id, invested_amount, earned in batch:
+            total_earnings = earned or Decimal('0')
+            roi = (total_earnings / invested_amount * 100).quantize(Decimal('0.01')) if invested_amount > 0 else Decimal('0')
+            row = cls(
+                id=existing.get(position_id),
+                analytics_id=analytics_ids[user_id],
+                user_income_stream_id=position_id,
+                total_earnings=total_earnings,
+                roi=roi,
+                last_updated=now,
+            )
+            (to_update if row.id else to_create).append(row)
+
+        with transaction.atomic():
+            if to_update:
+                cls.objects.bulk_update(to_update, ['total_earnings', 'roi', 'last_updated'])
+            if to_create:
+                cls.objects.bulk_create(to_create, ignore_conflicts=True)
+
 class AnalyticsSnapshot(models.Model):
     """
     Model for storing periodic snapshots of user analytics.
@@ -136,3 +217,59 @@ class AnalyticsSnapshot(models.Model):
             total_earnings=analytics.total_earnings,
             overall_roi=analytics.overall_roi
         )
+
+class AnalyticsReportJob(models.Model):
+    """
+    Model tracking an asynchronous analytics report build.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    analytics = models.ForeignKey(Analytics, on_delete=models.CASCADE, related_name='report_jobs')
+    data_version = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['analytics', 'data_version', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Report job {self.id} for {self.analytics.user.username} ({self.status})"
+
+class ROISketch(models.Model):
+    """
+    Model storing a serialized ROI quantile sketch, platform-wide or per income stream.
+    """
+    GLOBAL_SCOPE = 'global'
+
+    scope = models.CharField(max_length=50, unique=True)
+    count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ROI sketch ({self.scope}) over {self.count} values"
+
+    @classmethod
+    def scope_for(cls, income_stream_id=None):
+        if income_stream_id is None:
+            return cls.GLOBAL_SCOPE
+        return f'income_stream:{income_stream_id}'
+
+@receiver([post_save, post_delete], sender=Earnings)
+def bump_version_on_earnings_change(sender, instance, **kwargs):
+    Analytics.bump_data_version(user__income_streams=instance.user_income_stream_id)
+
+@receiver([post_save, post_delete], sender=UserIncomeStream)
+def bump_version_on_investment_change(sender, instance, **kwargs):
+    Analytics.bump_data_version(user_id=instance.user_id)
@@ -0,0 +1,75 @@
+## analytics/reports.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import PredictedEarnings, PerformanceMetric, RiskAssessment, IncomeStreamAnalytics, AnalyticsReportJob
+from .serializers import AnalyticsReportSerializer
+
+REPORT_CACHE_KEY = 'analytics:report:{user_id}:{data_version}'
+
+def report_cache_key(analytics, data_version=None):
+    if data_version is None:
+        data_version = analytics.data_version
+    return REPORT_CACHE_KEY.format(user_id=analytics.user_id, data_version=data_version)
+
+def build_report(analytics):
+    """
+    Recompute the user's totals and serialize the full report.
+    """
+    analytics.generate_report()
+
+    report_data = {
+        'total_investments': analytics.total_investments,
+        'total_earnings': analytics.total_earnings,
+        'overall_roi': analytics.overall_roi,
+        'predicted_earnings': PredictedEarnings.objects.filter(analytics=analytics),
+        'performance_metrics': PerformanceMetric.objects.filter(analytics=analytics),
+        'risk_assessment': RiskAssessment.objects.filter(analytics=analytics).last(),
+        'income_stream_analytics': IncomeStreamAnalytics.objects.filter(analytics=analytics),
+    }
+    return AnalyticsReportSerializer(report_data).data
+
+def store_report(analytics, data_version, report):
+    cache.set(report_cache_key(analytics, data_version), report, settings.ANALYTICS_REPORT_CACHE_TIMEOUT)
+
+def get_cached_report(analytics):
+    """
+    Return the report built for the analytics' current data version, or None.
+
+    The cache is checked first; completed jobs are the durable fallback so a
+    cold or per-process cache never forces a rebuild.
+    """
+    key = report_cache_key(analytics)
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    job = AnalyticsReportJob.objects.filter(
+        analytics=analytics,
+        data_version=analytics.data_version,
+        status='completed'
+    ).order_by('-completed_at').only('result').first()
+    if job is None:
+        return None
+
+    cache.set(key, job.result, settings.ANALYTICS_REPORT_CACHE_TIMEOUT)
+    return job.result
+
+def enqueue_report_job(analytics):
+    """
+    Return the in-flight job for the current data version, or start a new one.
+    """
+    from .tasks import generate_analytics_report
+
+    job = AnalyticsReportJob.objects.filter(
+        analytics=analytics,
+        data_version=analytics.data_version,
+        status__in=['pending', 'running']
+    ).first()
+    if job is not None:
+        return job
+
+    job = AnalyticsReportJob.objects.create(analytics=analytics, data_version=analytics.data_version)
+    transaction.on_commit(lambda: generate_analytics_report.apply_async(args=[str(job.id)], queue='analytics'))
+    return job
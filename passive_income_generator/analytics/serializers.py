@@ -1,7 +1,7 @@
 ## analytics/serializers.py
 
 from rest_framework import serializers
-from .models import Analytics, PredictedEarnings, PerformanceMetric, RiskAssessment, IncomeStreamAnalytics, AnalyticsSnapshot
+from .models import Analytics, PredictedEarnings, PerformanceMetric, RiskAssessment, IncomeStreamAnalytics, AnalyticsSnapshot, AnalyticsReportJob
 from income_streams.models import UserIncomeStream
 from django.contrib.auth import get_user_model
 
@@ -91,6 +91,12 @@ class AnalyticsReportSerializer(serializers.Serializer):
     risk_assessment = RiskAssessmentSerializer(read_only=True)
     income_stream_analytics = IncomeStreamAnalyticsSerializer(many=True, read_only=True)
 
+class AnalyticsReportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalyticsReportJob
+        fields = ['id', 'status', 'data_version', 'result', 'error', 'created_at', 'completed_at']
+        read_only_fields = fields
+
 class AnalyticsPredictionSerializer(serializers.Serializer):
     start_date = serializers.DateField()
     end_date = serializers.DateField()
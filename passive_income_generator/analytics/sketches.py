@@ -0,0 +1,187 @@
+## analytics/sketches.py
+
+import math
+import random
+import struct
+import time
+from bisect import bisect_right
+from array import array
+from django.conf import settings
+from django.db import transaction
+from .models import Analytics, IncomeStreamAnalytics, ROISketch
+
+class KLLSketch:
+    """
+    KLL quantile sketch: bounded-memory approximation of a value distribution.
+
+    Memory stays around 3 * k items regardless of how many values are added,
+    with rank error on the order of 1/k.
+    """
+    HEADER = struct.Struct('<IQI')
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+        self._cdf = None
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _max_size(self):
+        return sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def _size(self):
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def update(self, value):
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self._cdf = None
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.n += other.n
+        self._cdf = None
+        while self._size() >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        for height, compactor in enumerate(self.compactors):
+            if len(compactor) >= self._capacity(height):
+                if height + 1 == len(self.compactors):
+                    self.compactors.append([])
+                compactor.sort()
+                # Keep every other item (random parity); promoted items weigh twice as much.
+                offset = self._random.randint(0, 1)
+                leftover = [compactor.pop(0)] if len(compactor) % 2 else []
+                self.compactors[height + 1].extend(compactor[offset::2])
+                self.compactors[height] = leftover
+                return
+
+    def _build_cdf(self):
+        weighted = sorted(
+            (value, 2 ** height)
+            for height, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        values = array('d')
+        cumulative = array('d')
+        total = 0
+        for value, weight in weighted:
+            total += weight
+            values.append(value)
+            cumulative.append(total)
+        self._cdf = (values, cumulative, total)
+
+    def rank(self, value):
+        """
+        Return the approximate fraction of added values that are <= value.
+        """
+        if self.n == 0:
+            return 0.0
+        if self._cdf is None:
+            self._build_cdf()
+        values, cumulative, total = self._cdf
+        index = bisect_right(values, float(value))
+        return cumulative[index - 1] / total if index else 0.0
+
+    def quantile(self, fraction):
+        if self.n == 0:
+            return None
+        if self._cdf is None:
+            self._build_cdf()
+        values, cumulative, total = self._cdf
+        target = fraction * total
+        index = min(bisect_right(cumulative, target), len(values) - 1)
+        return values[index]
+
+    def to_bytes(self):
+        parts = [self.HEADER.pack(self.k, self.n, len(self.compactors))]
+        parts.append(array('I', [len(compactor) for compactor in self.compactors]).tobytes())
+        for compactor in self.compactors:
+            parts.append(array('d', compactor).tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        k, n, levels = cls.HEADER.unpack_from(data)
+        offset = cls.HEADER.size
+        lengths = array('I')
+        lengths.frombytes(data[offset:offset + levels * lengths.itemsize])
+        offset += levels * lengths.itemsize
+
+        sketch = cls(k=k)
+        sketch.n = n
+        sketch.compactors = []
+        for length in lengths:
+            items = array('d')
+            items.frombytes(data[offset:offset + length * items.itemsize])
+            offset += length * items.itemsize
+            sketch.compactors.append(items.tolist())
+        return sketch
+
+def build_roi_sketches(chunk_size=5000):
+    """
+    Stream every user's overall ROI and every position's ROI into sketches and persist them.
+
+    Returns the number of sketches written.
+    """
+    k = settings.ROI_SKETCH_K
+    global_sketch = KLLSketch(k=k)
+    for roi in Analytics.objects.values_list('overall_roi', flat=True).iterator(chunk_size=chunk_size):
+        global_sketch.update(roi)
+
+    stream_sketches = {}
+    rows = IncomeStreamAnalytics.objects.values_list(
+        'user_income_stream__income_stream_id', 'roi'
+    ).iterator(chunk_size=chunk_size)
+    for income_stream_id, roi in rows:
+        if income_stream_id not in stream_sketches:
+            stream_sketches[income_stream_id] = KLLSketch(k=k)
+        stream_sketches[income_stream_id].update(roi)
+
+    sketches = {ROISketch.GLOBAL_SCOPE: global_sketch}
+    for income_stream_id, sketch in stream_sketches.items():
+        sketches[ROISketch.scope_for(income_stream_id)] = sketch
+
+    with transaction.atomic():
+        ROISketch.objects.exclude(scope__in=sketches.keys()).delete()
+        for scope, sketch in sketches.items():
+            ROISketch.objects.update_or_create(
+                scope=scope,
+                defaults={'count': sketch.n, 'data': sketch.to_bytes()}
+            )
+    _loaded_sketches.clear()
+    return len(sketches)
+
+# scope -> (loaded_at, sketch or None); refreshed at most every ROI_SKETCH_RELOAD_INTERVAL seconds.
+_loaded_sketches = {}
+
+def get_sketch(income_stream_id=None):
+    scope = ROISketch.scope_for(income_stream_id)
+    cached = _loaded_sketches.get(scope)
+    if cached is not None and time.monotonic() - cached[0] < settings.ROI_SKETCH_RELOAD_INTERVAL:
+        return cached[1]
+
+    data = ROISketch.objects.filter(scope=scope).values_list('data', flat=True).first()
+    sketch = KLLSketch.from_bytes(data) if data is not None else None
+    _loaded_sketches[scope] = (time.monotonic(), sketch)
+    return sketch
+
+def percentile_rank(roi, income_stream_id=None):
+    """
+    Return the percentage of users (or positions in an income stream) with ROI <= roi, or None.
+    """
+    sketch = get_sketch(income_stream_id)
+    if sketch is None or sketch.n == 0:
+        return None
+    return round(sketch.rank(roi) * 100, 2)
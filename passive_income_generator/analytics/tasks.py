@@ -0,0 +1,57 @@
+## analytics/tasks.py
+
+from celery import shared_task
+from django.utils import timezone
+from .models import AnalyticsReportJob, IncomeStreamAnalytics
+from .reports import build_report, store_report
+from .warehouse import export_all
+from .sketches import build_roi_sketches
+
+@shared_task(bind=True)
+def generate_analytics_report(self, job_id):
+    """
+    Build the report for a queued AnalyticsReportJob and cache the result.
+    """
+    job = AnalyticsReportJob.objects.select_related('analytics').get(pk=job_id)
+    if job.status != 'pending':
+        return job.status
+
+    job.status = 'running'
+    job.save(update_fields=['status'])
+
+    try:
+        report = build_report(job.analytics)
+    except Exception as exc:
+        job.status = 'failed'
+        job.error = str(exc)
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'completed_at'])
+        raise
+
+    job.status = 'completed'
+    job.result = report
+    job.completed_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'completed_at'])
+    store_report(job.analytics, job.data_version, report)
+    return job.status
+
+@shared_task
+def export_analytics_warehouse():
+    """
+    Append new income stream and analytics rows to the Parquet warehouse and refresh today's position snapshot.
+    """
+    return export_all()
+
+@shared_task
+def generate_daily_analytics():
+    """
+    Daily analytics batch: refresh per-position analytics, then rebuild the ROI percentile sketches.
+    """
+    return {
+        'positions_refreshed': IncomeStreamAnalytics.bulk_refresh(),
+        'roi_sketches': build_roi_sketches(),
+    }
+
+@shared_task
+def refresh_income_stream_analytics(user_ids=None, shard_index=None, shard_count=None):
+    return IncomeStreamAnalytics.bulk_refresh(user_ids=user_ids, shard_index=shard_index, shard_count=shard_count)
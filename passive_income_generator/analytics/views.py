@@ -7,13 +7,15 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
-from .models import Analytics, PredictedEarnings, PerformanceMetric, RiskAssessment, IncomeStreamAnalytics, AnalyticsSnapshot
+from .models import Analytics, PredictedEarnings, PerformanceMetric, RiskAssessment, IncomeStreamAnalytics, AnalyticsSnapshot, AnalyticsReportJob
 from .serializers import (
     AnalyticsSerializer, PredictedEarningsSerializer, PerformanceMetricSerializer,
     RiskAssessmentSerializer, IncomeStreamAnalyticsSerializer, AnalyticsSnapshotSerializer,
-    UserAnalyticsSerializer, AnalyticsReportSerializer, AnalyticsPredictionSerializer,
-    RiskAssessmentRequestSerializer
+    UserAnalyticsSerializer, AnalyticsPredictionSerializer,
+    RiskAssessmentRequestSerializer, AnalyticsReportJobSerializer
 )
+from .reports import get_cached_report, enqueue_report_job
+from .sketches import percentile_rank
 from income_streams.models import UserIncomeStream, IncomeStream
 from django.db.models import Sum, F
 import numpy as np
@@ -96,20 +98,27 @@ class GenerateAnalyticsReportView(APIView):
 
     def get(self, request):
         analytics = get_object_or_404(Analytics, user=request.user)
-        analytics.generate_report()
+        report = get_cached_report(analytics)
+        if report is not None:
+            return Response(report)
 
-        report_data = {
-            'total_investments': analytics.total_investments,
-            'total_earnings': analytics.total_earnings,
-            'overall_roi': analytics.overall_roi,
-            'predicted_earnings': PredictedEarnings.objects.filter(analytics=analytics),
-            'performance_metrics': PerformanceMetric.objects.filter(analytics=analytics),
-            'risk_assessment': RiskAssessment.objects.filter(analytics=analytics).last(),
-            'income_stream_analytics': IncomeStreamAnalytics.objects.filter(analytics=analytics),
-        }
+        # No report for the current data version yet: build it off the request path.
+        job = enqueue_report_job(analytics)
+        serializer = AnalyticsReportJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
-        serializer = AnalyticsReportSerializer(report_data)
-        return Response(serializer.data)
+    def post(self, request):
+        analytics = get_object_or_404(Analytics, user=request.user)
+        job = enqueue_report_job(analytics)
+        serializer = AnalyticsReportJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+class AnalyticsReportJobView(generics.RetrieveAPIView):
+    serializer_class = AnalyticsReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AnalyticsReportJob.objects.filter(analytics__user=self.request.user)
 
 class PredictFutureEarningsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -220,6 +229,18 @@ class IncomeStreamAnalyticsUpdateView(generics.UpdateAPIView):
         instance = serializer.save()
         instance.update_analytics()
 
+class IncomeStreamAnalyticsRefreshView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        refreshed = IncomeStreamAnalytics.bulk_refresh(user_ids=[request.user.id])
+        income_stream_analytics = IncomeStreamAnalytics.objects.filter(analytics__user=request.user)
+        serializer = IncomeStreamAnalyticsSerializer(income_stream_analytics, many=True)
+        return Response({
+            "refreshed": refreshed,
+            "income_stream_analytics": serializer.data
+        })
+
 class AnalyticsOverviewView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -239,3 +260,26 @@ class AnalyticsOverviewView(APIView):
             "active_income_streams": income_streams.count(),
             "last_report_date": analytics.last_report_date
         })
+
+class ROIPercentileView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        analytics = get_object_or_404(Analytics, user=request.user)
+        positions = IncomeStreamAnalytics.objects.filter(analytics=analytics).values_list(
+            'user_income_stream__income_stream_id', 'user_income_stream__income_stream__name', 'roi'
+        )
+
+        return Response({
+            "overall_roi": analytics.overall_roi,
+            "overall_percentile": percentile_rank(analytics.overall_roi),
+            "income_streams": [
+                {
+                    "income_stream_id": income_stream_id,
+                    "income_stream_name": name,
+                    "roi": roi,
+                    "percentile": percentile_rank(roi, income_stream_id),
+                }
+                for income_stream_id, name, roi in positions
+            ]
+        })
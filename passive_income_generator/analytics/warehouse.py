@@ -0,0 +1,233 @@
+## analytics/warehouse.py
+
+import json
+import os
+import shutil
+from collections import defaultdict
+from datetime import timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.utils import timezone
+from income_streams.models import UserIncomeStream, Earnings, IncomeStreamPerformance
+from .models import AnalyticsSnapshot
+
+WATERMARK_FILE = '_watermarks.json'
+
+# Each exported table: source queryset, the columns pulled with values_list()
+# (in order), their Arrow types, and the column the files are partitioned by.
+# Append-only tables are exported incrementally above a primary-key watermark,
+# holding back rows whose 'settled_by' insert timestamp is newer than
+# ANALYTICS_WAREHOUSE_SETTLE_SECONDS; 'snapshot' tables hold mutable rows and
+# are re-exported in full, one partition per export day, so later changes
+# (e.g. invested_amount) show up.
+EXPORT_TABLES = {
+    'earnings': {
+        'queryset': Earnings.objects.all(),
+        'columns': [
+            ('id', 'id', pa.int64()),
+            ('user_income_stream_id', 'user_income_stream_id', pa.int64()),
+            ('user_id', 'user_income_stream__user_id', pa.int64()),
+            ('income_stream_id', 'user_income_stream__income_stream_id', pa.int64()),
+            ('risk_level', 'user_income_stream__income_stream__risk_level', pa.string()),
+            ('amount', 'amount', pa.decimal128(10, 2)),
+            ('earning_date', 'earning_date', pa.timestamp('us', tz='UTC')),
+        ],
+        'partition_by': 'earning_date',
+        'settled_by': 'earning_date',
+    },
+    'user_income_streams': {
+        'queryset': UserIncomeStream.objects.all(),
+        'columns': [
+            ('id', 'id', pa.int64()),
+            ('user_id', 'user_id', pa.int64()),
+            ('income_stream_id', 'income_stream_id', pa.int64()),
+            ('risk_level', 'income_stream__risk_level', pa.string()),
+            ('invested_amount', 'invested_amount', pa.decimal128(10, 2)),
+            ('investment_date', 'investment_date', pa.timestamp('us', tz='UTC')),
+            ('user_date_joined', 'user__date_joined', pa.timestamp('us', tz='UTC')),
+        ],
+        'snapshot': True,
+    },
+    # Only holds rows entered through the income stream performance records;
+    # no job derives them, so the table is empty unless those are maintained.
+    # They can be edited and carry no insert timestamp, so they are snapshotted.
+    'income_stream_performance': {
+        'queryset': IncomeStreamPerformance.objects.all(),
+        'columns': [
+            ('id', 'id', pa.int64()),
+            ('income_stream_id', 'income_stream_id', pa.int64()),
+            ('risk_level', 'income_stream__risk_level', pa.string()),
+            ('date', 'date', pa.date32()),
+            ('return_rate', 'return_rate', pa.decimal128(5, 2)),
+            ('total_invested', 'total_invested', pa.decimal128(12, 2)),
+            ('total_earnings', 'total_earnings', pa.decimal128(12, 2)),
+        ],
+        'snapshot': True,
+    },
+    'analytics_snapshots': {
+        'queryset': AnalyticsSnapshot.objects.all(),
+        'columns': [
+            ('id', 'id', pa.int64()),
+            ('user_id', 'analytics__user_id', pa.int64()),
+            ('snapshot_date', 'snapshot_date', pa.timestamp('us', tz='UTC')),
+            ('total_investments', 'total_investments', pa.decimal128(12, 2)),
+            ('total_earnings', 'total_earnings', pa.decimal128(12, 2)),
+            ('overall_roi', 'overall_roi', pa.decimal128(5, 2)),
+            ('user_date_joined', 'analytics__user__date_joined', pa.timestamp('us', tz='UTC')),
+        ],
+        'partition_by': 'snapshot_date',
+        'settled_by': 'snapshot_date',
+    },
+}
+
+def warehouse_root():
+    return settings.ANALYTICS_WAREHOUSE_ROOT
+
+def load_watermarks(root=None):
+    path = os.path.join(root or warehouse_root(), WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_watermarks(watermarks, root=None):
+    root = root or warehouse_root()
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, WATERMARK_FILE)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(watermarks, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _partition_date(value):
+    # Timestamps come back as aware UTC datetimes; DateFields are already dates.
+    return value.date() if hasattr(value, 'date') else value
+
+def _schema(spec):
+    return pa.schema([(name, arrow_type) for name, _, arrow_type in spec['columns']])
+
+def _write_file(path, schema, rows):
+    columns = list(zip(*rows))
+    arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+    pq.write_table(pa.Table.from_arrays(arrays, schema=schema), path, compression='zstd')
+
+def _write_batch(root, table_name, spec, rows, start_pk):
+    names = [name for name, _, _ in spec['columns']]
+    schema = _schema(spec)
+    partition_index = names.index(spec['partition_by'])
+
+    partitions = defaultdict(list)
+    for row in rows:
+        partitions[_partition_date(row[partition_index])].append(row)
+
+    written = []
+    for day, day_rows in sorted(partitions.items()):
+        directory = os.path.join(root, table_name, f'partition_date={day.isoformat()}')
+        os.makedirs(directory, exist_ok=True)
+        # Named by the watermark the batch started from, not its last pk: a retry
+        # after a crash re-reads from the same watermark and overwrites these
+        # files even if new rows have since been appended to the batch.
+        path = os.path.join(directory, f'part-{start_pk:012d}.parquet')
+        _write_file(path, schema, day_rows)
+        written.append(path)
+    return written
+
+def export_snapshot(table_name, root=None, batch_size=None, day=None):
+    """
+    Write every row of a snapshot table to the partition for day (default: today).
+
+    The partition is built in a staging directory and swapped in whole, so a
+    failed run leaves the previous snapshot for that day in place. Returns the
+    number of rows exported.
+    """
+    root = root or warehouse_root()
+    batch_size = batch_size or settings.ANALYTICS_WAREHOUSE_BATCH_SIZE
+    day = day or timezone.now().date()
+    spec = EXPORT_TABLES[table_name]
+    schema = _schema(spec)
+    lookups = [lookup for _, lookup, _ in spec['columns']]
+
+    partition = f'partition_date={day.isoformat()}'
+    staging = os.path.join(root, '_staging', table_name, partition)
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    exported = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            spec['queryset'].filter(pk__gt=last_pk).order_by('pk').values_list(*lookups)[:batch_size]
+        )
+        if not rows:
+            break
+        _write_file(os.path.join(staging, f'part-{exported // batch_size:06d}.parquet'), schema, rows)
+        last_pk = rows[-1][0]
+        exported += len(rows)
+
+    directory = os.path.join(root, table_name, partition)
+    replaced = f'{staging}.replaced'
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    if os.path.exists(directory):
+        os.rename(directory, replaced)
+    if exported:
+        os.rename(staging, directory)
+    shutil.rmtree(replaced, ignore_errors=True)
+    shutil.rmtree(staging, ignore_errors=True)
+    return exported
+
+def _settled(spec, last_pk, now):
+    """
+    Return the rows above last_pk that are safe to put behind the watermark.
+
+    Primary keys are drawn before commit, so a row can become visible after a
+    higher one was exported. Rows inserted more than the settle time ago are
+    taken as committed, and the export stops below the first row that is not,
+    so the watermark never passes a row that may still show up.
+    """
+    settled_by = spec['settled_by']
+    cutoff = now - timedelta(seconds=settings.ANALYTICS_WAREHOUSE_SETTLE_SECONDS)
+    rows = spec['queryset'].filter(pk__gt=last_pk, **{f'{settled_by}__lt': cutoff})
+    first_unsettled = (
+        spec['queryset'].filter(pk__gt=last_pk, **{f'{settled_by}__gte': cutoff})
+        .order_by('pk').values_list('pk', flat=True).first()
+    )
+    if first_unsettled is not None:
+        rows = rows.filter(pk__lt=first_unsettled)
+    return rows
+
+def export_table(table_name, root=None, batch_size=None, now=None):
+    """
+    Append settled rows above the table's primary-key watermark to date-partitioned Parquet files.
+
+    Returns the number of rows exported.
+    """
+    root = root or warehouse_root()
+    batch_size = batch_size or settings.ANALYTICS_WAREHOUSE_BATCH_SIZE
+    now = now or timezone.now()
+    spec = EXPORT_TABLES[table_name]
+    lookups = [lookup for _, lookup, _ in spec['columns']]
+    settled = _settled(spec, load_watermarks(root).get(table_name, 0), now)
+
+    exported = 0
+    while True:
+        watermarks = load_watermarks(root)
+        last_pk = watermarks.get(table_name, 0)
+        rows = list(
+            settled.filter(pk__gt=last_pk).order_by('pk').values_list(*lookups)[:batch_size]
+        )
+        if not rows:
+            return exported
+
+        _write_batch(root, table_name, spec, rows, last_pk)
+        watermarks[table_name] = rows[-1][0]
+        save_watermarks(watermarks, root)
+        exported += len(rows)
+
+def export_all(root=None, batch_size=None):
+    return {
+        table_name: (export_snapshot if spec.get('snapshot') else export_table)(
+            table_name, root=root, batch_size=batch_size
+        )
+        for table_name, spec in EXPORT_TABLES.items()
+    }
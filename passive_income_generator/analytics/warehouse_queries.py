@@ -0,0 +1,86 @@
+## analytics/warehouse_queries.py
+
+import glob
+import os
+import duckdb
+from .warehouse import EXPORT_TABLES, warehouse_root
+
+def connect(root=None):
+    """
+    Open an in-memory DuckDB connection with one view per exported table.
+
+    Only tables with at least one exported file get a view.
+    """
+    root = root or warehouse_root()
+    connection = duckdb.connect(database=':memory:')
+    for table_name in EXPORT_TABLES:
+        pattern = os.path.join(root, table_name, '*', '*.parquet')
+        if not glob.glob(pattern):
+            continue
+        pattern = pattern.replace("'", "''")
+        connection.execute(
+            f"CREATE VIEW {table_name} AS "
+            f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = 1)"
+        )
+    return connection
+
+def _fetch(sql, params=None, root=None):
+    connection = connect(root)
+    try:
+        cursor = connection.execute(sql, params or [])
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+def aum_by_risk_level(start_date=None, end_date=None, root=None):
+    """
+    Assets under management per risk level and day, from the daily user income stream snapshots.
+    """
+    sql = """
+        SELECT partition_date AS date, risk_level, SUM(invested_amount) AS total_invested,
+               COUNT(DISTINCT user_id) AS investors
+        FROM user_income_streams
+        WHERE (? IS NULL OR partition_date >= ?) AND (? IS NULL OR partition_date <= ?)
+        GROUP BY partition_date, risk_level
+        ORDER BY partition_date, risk_level
+    """
+    return _fetch(sql, [start_date, start_date, end_date, end_date], root=root)
+
+def earnings_by_risk_level(start_date=None, end_date=None, root=None):
+    """
+    Daily earnings paid out per risk level.
+    """
+    sql = """
+        SELECT CAST(earning_date AS DATE) AS day, risk_level, SUM(amount) AS total_earnings,
+               COUNT(DISTINCT user_id) AS earning_users
+        FROM earnings
+        WHERE (? IS NULL OR CAST(earning_date AS DATE) >= ?) AND (? IS NULL OR CAST(earning_date AS DATE) <= ?)
+        GROUP BY day, risk_level
+        ORDER BY day, risk_level
+    """
+    return _fetch(sql, [start_date, start_date, end_date, end_date], root=root)
+
+def cohort_roi_by_signup_month(root=None):
+    """
+    ROI per signup-month cohort, using each user's most recent analytics snapshot.
+    """
+    sql = """
+        WITH latest AS (
+            SELECT user_id, user_date_joined, total_investments, total_earnings,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY snapshot_date DESC) AS rank
+            FROM analytics_snapshots
+        )
+        SELECT DATE_TRUNC('month', user_date_joined) AS signup_month,
+               COUNT(*) AS users,
+               SUM(total_investments) AS total_investments,
+               SUM(total_earnings) AS total_earnings,
+               CASE WHEN SUM(total_investments) > 0
+                    THEN SUM(total_earnings) / SUM(total_investments) * 100
+                    ELSE 0 END AS roi
+        FROM latest
+        WHERE rank = 1
+        GROUP BY signup_month
+        ORDER BY signup_month
+    """
+    return _fetch(sql, root=root)
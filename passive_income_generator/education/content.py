@@ -0,0 +1,81 @@
+## education/content.py
+
+import gzip
+import re
+from django.conf import settings
+from django.core.cache import cache
+from .models import EducationResource
+
+EXCERPT_LENGTH = 280
+
+# Columns behind list representations; the body stays in the table (and out of the TOAST fetch).
+SUMMARY_FIELDS = [
+    'id', 'title', 'slug', 'excerpt', 'resource_type', 'publication_date', 'last_updated', 'author',
+    'difficulty_level', 'estimated_reading_time', 'is_published', 'view_count', 'rating_count', 'average_rating',
+]
+
+BODY_CACHE_KEY = 'education-resource-body:{resource_id}:{stamp}'
+
+WHITESPACE_RE = re.compile(r'\s+')
+TAG_RE = re.compile(r'<[^>]+>')
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """
+    Plain-text start of the body, cut at a word boundary.
+    """
+    text = WHITESPACE_RE.sub(' ', TAG_RE.sub(' ', content or '')).strip()
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + '…'
+
+def summaries(queryset=None):
+    """
+    Resources with only the columns list representations need.
+    """
+    queryset = EducationResource.objects.all() if queryset is None else queryset
+    return queryset.only(*SUMMARY_FIELDS)
+
+def body_cache_key(resource):
+    return BODY_CACHE_KEY.format(resource_id=resource.pk, stamp=resource.last_updated.timestamp())
+
+def get_body(resource):
+    """
+    Return the resource's body from the cache, fetching only that column on a miss.
+
+    Entries are keyed by last_updated, so an edit is never served stale; large
+    bodies are kept gzipped and decompressed when read.
+    """
+    key = body_cache_key(resource)
+    cached = cache.get(key)
+    if cached is not None:
+        compressed, payload = cached
+        return gzip.decompress(payload).decode('utf-8') if compressed else payload
+
+    body = EducationResource.objects.filter(pk=resource.pk).values_list('content', flat=True).first() or ''
+    encoded = body.encode('utf-8')
+    if len(encoded) >= settings.EDUCATION_BODY_COMPRESS_MIN_BYTES:
+        cache.set(key, (True, gzip.compress(encoded, compresslevel=6)), settings.EDUCATION_BODY_CACHE_TIMEOUT)
+    else:
+        cache.set(key, (False, body), settings.EDUCATION_BODY_CACHE_TIMEOUT)
+    return body
+
+def backfill_excerpts(batch_size=500):
+    """
+    Fill in excerpts for resources saved before excerpts existed; returns the number updated.
+    """
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            EducationResource.objects.filter(pk__gt=last_pk, excerpt='')
+            .only('id', 'content')
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return updated
+        last_pk = batch[-1].pk
+        for resource in batch:
+            resource.excerpt = make_excerpt(resource.content)
+        EducationResource.objects.bulk_update([resource for resource in batch if resource.excerpt], ['excerpt'])
+        updated += sum(1 for resource in batch if resource.excerpt)
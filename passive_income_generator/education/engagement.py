@@ -0,0 +1,202 @@
+## education/engagement.py
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, Q
+from django.utils import timezone
+from .models import (
+    EducationResource, LearningPath, LearningPathEngagement, QuizQuestion, QuizQuestionStats,
+    ResourceEngagement, UserLearningPathProgress, UserProgress, UserQuizAnswer, UserQuizAttempt
+)
+
+def _rate(part, whole):
+    return part / whole if whole else 0
+
+def _replace(model, rows):
+    # Readers see either the previous or the new summaries, never a partial set.
+    with transaction.atomic():
+        model.objects.all().delete()
+        model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+def aggregate_resource_engagement(now):
+    """
+    Summarise completions, time to completion and quiz results per resource with two grouped queries.
+    """
+    time_to_complete = ExpressionWrapper(F('completion_date') - F('started_at'), output_field=DurationField())
+    progress = {
+        row['resource_id']: row
+        for row in UserProgress.objects.order_by().values('resource_id').annotate(
+            learners=Count('id'),
+            completions=Count('id', filter=Q(completed=True)),
+            average_duration=Avg(
+                time_to_complete,
+                filter=Q(completed=True, started_at__isnull=False, completion_date__isnull=False)
+            ),
+        )
+    }
+    quizzes = {
+        row['quiz__resource_id']: row
+        for row in UserQuizAttempt.objects.order_by().values('quiz__resource_id').annotate(
+            attempts=Count('id'),
+            passes=Count('id', filter=Q(passed=True)),
+            average_score=Avg('score'),
+        )
+    }
+
+    rows = []
+    for resource_id in EducationResource.objects.order_by('pk').values_list('pk', flat=True).iterator():
+        learning = progress.get(resource_id, {})
+        quiz = quizzes.get(resource_id)
+        learners = learning.get('learners', 0)
+        completions = learning.get('completions', 0)
+        average_duration = learning.get('average_duration')
+        rows.append(ResourceEngagement(
+            resource_id=resource_id,
+            learners=learners,
+            completions=completions,
+            completion_rate=_rate(completions, learners),
+            average_seconds_to_complete=average_duration.total_seconds() if average_duration is not None else None,
+            quiz_attempts=quiz['attempts'] if quiz else 0,
+            quiz_pass_rate=_rate(quiz['passes'], quiz['attempts']) if quiz else None,
+            quiz_average_score=quiz['average_score'] if quiz else None,
+            computed_at=now,
+        ))
+    return _replace(ResourceEngagement, rows)
+
+def _path_completion_seconds(resource_counts):
+    """
+    Return {path id: mean seconds from a learner's first start to last completion} over learners who finished.
+    """
+    path = 'resource__learningpathitem__learning_path_id'
+    # One row per (path, user).
+    spans = (
+        UserProgress.objects.order_by()
+        .filter(resource__learningpathitem__isnull=False)
+        .values(path, 'user_id')
+        .annotate(
+            completions=Count('id', filter=Q(completed=True)),
+            first_start=Min('started_at'),
+            last_completion=Max('completion_date', filter=Q(completed=True)),
+        )
+        .values_list(path, 'completions', 'first_start', 'last_completion')
+    )
+    finished = [
+        (path_id, (last_completion - first_start).total_seconds())
+        for path_id, completions, first_start, last_completion in spans
+        if first_start is not None and last_completion is not None and completions >= resource_counts.get(path_id, 0) > 0
+    ]
+    if not finished:
+        return {}
+    path_ids, seconds = (np.asarray(column) for column in zip(*finished))
+    paths, index = np.unique(path_ids, return_inverse=True)
+    means = np.bincount(index, weights=seconds) / np.bincount(index)
+    return dict(zip(paths.tolist(), means.tolist()))
+
+def aggregate_learning_path_engagement(now):
+    """
+    Summarise learners, completions and time to completion per learning path.
+
+    Learners and completions come from the incrementally maintained progress
+    counters; time to completion groups UserProgress per (path, user).
+    """
+    resource_counts = dict(LearningPath.objects.values_list('pk', 'resource_count'))
+    progress = {
+        row['learning_path_id']: row
+        for row in UserLearningPathProgress.objects.order_by().values('learning_path_id').annotate(
+            learners=Count('id', filter=Q(completed_resources__gt=0)),
+            completions=Count('id', filter=Q(
+                completed_resources__gte=F('learning_path__resource_count'),
+                learning_path__resource_count__gt=0,
+            )),
+        )
+    }
+    seconds = _path_completion_seconds(resource_counts)
+
+    rows = []
+    for path_id in sorted(resource_counts):
+        learning = progress.get(path_id, {})
+        learners = learning.get('learners', 0)
+        completions = learning.get('completions', 0)
+        rows.append(LearningPathEngagement(
+            learning_path_id=path_id,
+            learners=learners,
+            completions=completions,
+            completion_rate=_rate(completions, learners),
+            average_seconds_to_complete=seconds.get(path_id),
+            computed_at=now,
+        ))
+    return _replace(LearningPathEngagement, rows)
+
+def question_statistics(question_ids, correct, scores):
+    """
+    Vectorised per-question statistics over parallel arrays of answer rows.
+
+    Returns (questions, responses, correct rate, discrimination), where
+    discrimination is the point-biserial correlation between answering the
+    question correctly and the attempt's score (NaN when either never varies).
+    """
+    questions, index = np.unique(question_ids, return_inverse=True)
+    correct = correct.astype(np.float64)
+    scores = scores.astype(np.float64)
+    responses = np.bincount(index)
+    sum_correct = np.bincount(index, weights=correct)
+    sum_scores = np.bincount(index, weights=scores)
+    sum_products = np.bincount(index, weights=correct * scores)
+    sum_squared_scores = np.bincount(index, weights=scores * scores)
+
+    covariance = responses * sum_products - sum_correct * sum_scores
+    # correct is 0/1, so its sum of squares equals its sum.
+    variance_correct = responses * sum_correct - sum_correct ** 2
+    variance_scores = responses * sum_squared_scores - sum_scores ** 2
+    denominator = np.sqrt(variance_correct * variance_scores)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discrimination = np.where(denominator > 0, covariance / denominator, np.nan)
+    return questions, responses, sum_correct / responses, discrimination
+
+def aggregate_question_statistics(now, quiz_batch_size=None):
+    """
+    Compute difficulty statistics for every quiz question, loading answers a batch of quizzes at a time.
+    """
+    quiz_batch_size = quiz_batch_size or settings.ENGAGEMENT_QUIZ_BATCH_SIZE
+    questions = list(QuizQuestion.objects.order_by('quiz_id', 'pk').values_list('pk', 'quiz_id'))
+    quiz_ids = sorted({quiz_id for _, quiz_id in questions})
+    stats = {}
+    for start in range(0, len(quiz_ids), quiz_batch_size):
+        answers = list(
+            UserQuizAnswer.objects.order_by()
+            .filter(question__quiz_id__in=quiz_ids[start:start + quiz_batch_size])
+            .values_list('question_id', 'answer__is_correct', 'attempt__score')
+        )
+        if not answers:
+            continue
+        question_ids, correct, scores = (np.asarray(column) for column in zip(*answers))
+        for question_id, responses, correct_rate, discrimination in zip(*(
+            array.tolist() for array in question_statistics(question_ids, correct, scores)
+        )):
+            stats[question_id] = (responses, correct_rate, None if np.isnan(discrimination) else discrimination)
+
+    rows = []
+    for question_id, quiz_id in questions:
+        responses, correct_rate, discrimination = stats.get(question_id, (0, None, None))
+        rows.append(QuizQuestionStats(
+            question_id=question_id,
+            quiz_id=quiz_id,
+            responses=responses,
+            correct_rate=correct_rate,
+            discrimination=discrimination,
+            computed_at=now,
+        ))
+    return _replace(QuizQuestionStats, rows)
+
+def aggregate_education_engagement(now=None):
+    """
+    Rebuild every education engagement summary table; returns the rows written per table.
+    """
+    now = now or timezone.now()
+    return {
+        'resources': aggregate_resource_engagement(now),
+        'learning_paths': aggregate_learning_path_engagement(now),
+        'questions': aggregate_question_statistics(now),
+    }
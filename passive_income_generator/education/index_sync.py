@@ -0,0 +1,184 @@
+## education/index_sync.py
+
+import logging
+import threading
+import time
+from django.core.cache import cache
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+class ChangeLog:
+    """
+    Numbered log of changes kept in the shared Django cache.
+
+    Every process keeps its own copy of an in-memory index; the log lets each
+    copy replay the changes made elsewhere instead of rebuilding. Entries
+    expire after ENTRY_TIMEOUT, so a copy that falls further behind rebuilds.
+    """
+    ENTRY_TIMEOUT = 60 * 60 * 24
+    MAX_REPLAY = 1000
+
+    def __init__(self, version_key):
+        self.version_key = version_key
+
+    def _entry_key(self, version):
+        return f'{self.version_key}:{version}'
+
+    def version(self):
+        cache.add(self.version_key, 0, timeout=None)
+        return cache.get(self.version_key, 0)
+
+    def record(self, entry):
+        """
+        Append entry and return its version; None entries mean readers must rebuild.
+        """
+        cache.add(self.version_key, 0, timeout=None)
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, timeout=None)
+            version = 1
+        # Wrapped so a None entry is told apart from a missing one.
+        cache.set(self._entry_key(version), (entry,), timeout=self.ENTRY_TIMEOUT)
+        return version
+
+    def entries(self, since, until):
+        """
+        Return the [(version, entry)] recorded after since, up to until, or None if a rebuild is needed.
+
+        Stops before a trailing entry that is not written yet; an entry missing
+        before later ones (expired or evicted), an unknown change, a restarted
+        counter or a long backlog all call for a rebuild.
+        """
+        if until < since or until - since > self.MAX_REPLAY:
+            return None
+        versions = range(since + 1, until + 1)
+        found = cache.get_many([self._entry_key(version) for version in versions])
+        entries = []
+        for version in versions:
+            wrapped = found.get(self._entry_key(version))
+            if wrapped is None:
+                if any(self._entry_key(later) in found for later in range(version + 1, until + 1)):
+                    return None
+                break
+            if wrapped[0] is None:
+                return None
+            entries.append((version, wrapped[0]))
+        return entries
+
+class LiveIndex:
+    """
+    One process's copy of an in-memory index, kept current from a ChangeLog off the request path.
+
+    build() returns a fresh index; load(entries) reads what changed from the
+    database and apply(index, loaded) patches the index in memory. Only the
+    very first build runs on a request. After that, a request that finds the
+    copy behind the log (or older than max_age seconds, or reporting
+    needs_rebuild) is served from the current copy while a background thread
+    replays the log or, when it cannot, builds a replacement and swaps it in.
+
+    Readers and patches share a lock, so queries never see a half-applied change.
+    """
+
+    def __init__(self, log, build, load, apply, max_age=None, name='index'):
+        self.log = log
+        self._build_index = build
+        self._load = load
+        self._apply = apply
+        self.max_age = max_age
+        self.name = name
+        self._index = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _build(self):
+        # Read the version first: changes made during the build are replayed afterwards.
+        version = self.log.version()
+        index = self._build_index()
+        index.version = version
+        index.built_at = time.monotonic()
+        return index
+
+    def _is_stale(self, index):
+        if getattr(index, 'needs_rebuild', False):
+            return True
+        max_age = self.max_age() if callable(self.max_age) else self.max_age
+        return max_age is not None and time.monotonic() - index.built_at > max_age
+
+    def query(self, read):
+        """
+        Return read(index) against this process's copy, scheduling a refresh when it is behind.
+        """
+        if self._index is None:
+            with self._refresh_lock:
+                if self._index is None:
+                    self._index = self._build()
+        elif self._index.version != self.log.version() or self._is_stale(self._index):
+            self._refresh_soon()
+        with self._lock:
+            return read(self._index)
+
+    def changed(self, entry):
+        """
+        Record a change once the current transaction commits and patch this process's copy.
+
+        Deferring to the commit keeps other processes from replaying (or
+        rebuilding from) rows that are not committed yet or are rolled back.
+        """
+        transaction.on_commit(lambda: self._record(entry))
+
+    def _record(self, entry):
+        version = self.log.record(entry)
+        index = self._index
+        if index is None:
+            return
+        if entry is not None and index.version == version - 1:
+            loaded = self._load([entry])
+            with self._lock:
+                if index is self._index and index.version == version - 1:
+                    self._apply(index, loaded)
+                    index.version = version
+                    return
+        self._refresh_soon()
+
+    def _refresh_soon(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_refresh, name=f'{self.name}-refresh', daemon=True)
+                self._thread.start()
+
+    def _run_refresh(self):
+        close_old_connections()
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Failed to refresh the %s", self.name)
+        finally:
+            connections.close_all()
+
+    def refresh(self):
+        """
+        Bring this process's copy up to date now: replay the log, or rebuild when it cannot.
+        """
+        with self._refresh_lock:
+            index = self._index
+            if index is None:
+                self._index = self._build()
+                return
+            entries = None if self._is_stale(index) else self.log.entries(index.version, self.log.version())
+            if entries is None:
+                rebuilt = self._build()
+                with self._lock:
+                    self._index = rebuilt
+                return
+            # The writer's own process may already have applied some of these.
+            entries = [(version, entry) for version, entry in entries if version > index.version]
+            if not entries:
+                return
+            loaded = self._load([entry for _, entry in entries])
+            with self._lock:
+                self._apply(index, loaded)
+                index.version = max(index.version, entries[-1][0])
@@ -0,0 +1,138 @@
+## education/learning_paths.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Prefetch, Q
+from django.db.models.functions import Coalesce
+from .models import LearningPath, LearningPathItem, UserLearningPathProgress, UserProgress
+
+LEARNING_PATH_CACHE_KEY = 'learning-path:{path_id}'
+
+def learning_path_cache_key(path_id):
+    return LEARNING_PATH_CACHE_KEY.format(path_id=path_id)
+
+def learning_paths_with_items():
+    """
+    Learning paths with their ordered items and each item's resource prefetched in one joined query.
+    """
+    return LearningPath.objects.prefetch_related(
+        Prefetch('learningpathitem_set', queryset=(
+            LearningPathItem.objects.select_related('resource').defer('resource__content').order_by('order')
+        ))
+    )
+
+def get_learning_path_document(path_id, render):
+    """
+    Return the rendered path document, rendering it with render(path) and caching it on a miss.
+
+    Saving the path, one of its items or one of its resources drops the
+    document (see invalidate_learning_paths), so a hit needs no query at all.
+    Returns None if the path does not exist.
+    """
+    key = learning_path_cache_key(path_id)
+    document = cache.get(key)
+    if document is None:
+        path = learning_paths_with_items().filter(pk=path_id).first()
+        if path is None:
+            return None
+        document = render(path)
+        # View counts and rating aggregates change without signals; the timeout bounds their staleness.
+        cache.set(key, document, settings.LEARNING_PATH_CACHE_TIMEOUT)
+    return document
+
+def invalidate_learning_paths(path_ids):
+    cache.delete_many([learning_path_cache_key(path_id) for path_id in path_ids])
+
+def invalidate_paths_containing(resource_id):
+    invalidate_learning_paths(
+        LearningPathItem.objects.filter(resource_id=resource_id).values_list('learning_path_id', flat=True)
+    )
+
+def add_path_completions(user_id, resource_id, delta):
+    """
+    Add delta to the user's completed count on every learning path containing the resource.
+
+    Missing rows are created empty first and then incremented, so two
+    concurrent first completions on one path both count.
+    """
+    path_ids = list(LearningPathItem.objects.filter(resource_id=resource_id).values_list('learning_path_id', flat=True))
+    if not path_ids:
+        return 0
+    rows = UserLearningPathProgress.objects.filter(user_id=user_id, learning_path_id__in=path_ids)
+    if delta > 0:
+        UserLearningPathProgress.objects.bulk_create(
+            [UserLearningPathProgress(user_id=user_id, learning_path_id=path_id) for path_id in path_ids],
+            ignore_conflicts=True
+        )
+    else:
+        rows = rows.filter(completed_resources__gte=-delta)
+    return rows.update(completed_resources=F('completed_resources') + delta)
+
+def learning_paths_with_progress(user):
+    """
+    Learning paths annotated with the user's completed_resources, in one LEFT JOIN query.
+    """
+    return LearningPath.objects.annotate(
+        progress_for_user=FilteredRelation('user_progress', condition=Q(user_progress__user=user)),
+        completed_resources=Coalesce(F('progress_for_user__completed_resources'), 0),
+    )
+
+def progress_percentage(completed_resources, total_resources):
+    if not total_resources:
+        return 0
+    return min(completed_resources / total_resources, 1) * 100
+
+def learning_path_membership_changed(path_id):
+    """
+    Recount the path's resources now and rebuild its users' progress after the transaction commits.
+    """
+    from .tasks import rebuild_learning_path_progress
+    LearningPath.objects.filter(pk=path_id).update(
+        resource_count=LearningPathItem.objects.filter(learning_path_id=path_id).count()
+    )
+    invalidate_learning_paths([path_id])
+    transaction.on_commit(lambda: rebuild_learning_path_progress.delay([path_id]))
+
+def rebuild_learning_path_progress(path_ids=None):
+    """
+    Recompute resource counts and every user's completed count for the given paths (all paths by default).
+
+    Each path is rebuilt in its own transaction with its progress rows locked,
+    so a completion racing with the rebuild waits and is applied on top of the
+    recomputed count. Returns the number of progress rows changed.
+    """
+    paths = LearningPath.objects.order_by('pk')
+    if path_ids is not None:
+        paths = paths.filter(pk__in=path_ids)
+    changed = 0
+    for path_id in paths.values_list('pk', flat=True):
+        with transaction.atomic():
+            rows = {
+                row.user_id: row
+                for row in UserLearningPathProgress.objects.select_for_update().filter(learning_path_id=path_id)
+            }
+            resource_ids = list(LearningPathItem.objects.filter(learning_path_id=path_id).values_list('resource_id', flat=True))
+            counts = dict(
+                UserProgress.objects.filter(resource_id__in=resource_ids, completed=True)
+                .values('user_id')
+                .annotate(completed=Count('id'))
+                .values_list('user_id', 'completed')
+            )
+            LearningPath.objects.filter(pk=path_id).update(resource_count=len(resource_ids))
+
+            drifted = []
+            for user_id, row in rows.items():
+                completed = counts.get(user_id, 0)
+                if row.completed_resources != completed:
+                    row.completed_resources = completed
+                    drifted.append(row)
+            missing = [
+                UserLearningPathProgress(user_id=user_id, learning_path_id=path_id, completed_resources=completed)
+                for user_id, completed in counts.items() if user_id not in rows
+            ]
+            UserLearningPathProgress.objects.bulk_update(drifted, ['completed_resources'], batch_size=1000)
+            UserLearningPathProgress.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+            changed += len(drifted) + len(missing)
+        invalidate_learning_paths([path_id])
+    return changed
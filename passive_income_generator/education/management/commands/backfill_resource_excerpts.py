@@ -0,0 +1,14 @@
+## education/management/commands/backfill_resource_excerpts.py
+
+from django.core.management.base import BaseCommand
+from education.content import backfill_excerpts
+
+class Command(BaseCommand):
+    help = "Fill in list excerpts for education resources saved before excerpts were stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = backfill_excerpts(options['batch_size'])
+        self.stdout.write(f"Stored excerpts for {updated} resources.")
@@ -0,0 +1,125 @@
+## education/management/commands/benchmark_search.py
+
+import random
+import time
+from itertools import accumulate
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from education.models import EducationResource
+from education.search import InvertedIndex, search_resources, supports_full_text_search, search_index_installed
+
+TOPIC_WORDS = (
+    'dividend stock bond etf index fund portfolio rental property real estate crypto staking yield '
+    'interest savings account compound growth risk return tax retirement budget income passive '
+    'royalty affiliate marketing blog course ebook subscription peer lending reit annuity hedge '
+    'inflation diversification allocation rebalancing volatility liquidity capital gain loss'
+).split()
+
+class SyntheticCorpus:
+    """
+    Reproducible articles: topic words plus a Zipf-distributed filler vocabulary.
+    """
+
+    def __init__(self, seed, vocabulary_size=20000):
+        self.random = random.Random(seed)
+        filler = [self._word() for _ in range(vocabulary_size)]
+        self.vocabulary = TOPIC_WORDS + filler
+        self.cum_weights = list(accumulate(1.0 / rank for rank in range(1, len(self.vocabulary) + 1)))
+
+    def _word(self):
+        return ''.join(self.random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(self.random.randint(4, 9)))
+
+    def words(self, count):
+        return self.random.choices(self.vocabulary, cum_weights=self.cum_weights, k=count)
+
+    def article(self):
+        return {
+            'title': ' '.join(self.words(self.random.randint(4, 8))).capitalize(),
+            'content': ' '.join(self.words(self.random.randint(80, 160))),
+            'resource_type': self.random.choice(EducationResource.RESOURCE_TYPES)[0],
+            'difficulty_level': self.random.randint(1, 5),
+        }
+
+    def query(self):
+        terms = self.random.choices(self.vocabulary[:2000], cum_weights=self.cum_weights[:2000], k=self.random.randint(1, 3))
+        filters = {}
+        if self.random.random() < 0.3:
+            filters['resource_type'] = self.random.choice(EducationResource.RESOURCE_TYPES)[0]
+        if self.random.random() < 0.3:
+            filters['difficulty_level'] = self.random.randint(1, 5)
+        return ' '.join(terms), filters
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class Command(BaseCommand):
+    help = "Benchmark education search latency on synthetic articles and report p50/p95/p99."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--backend', choices=['python', 'postgres'], default='python')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--passes', type=int, default=2, help="Runs over the same queries; later passes hit warm caches")
+
+    def handle(self, *args, **options):
+        corpus = SyntheticCorpus(options['seed'])
+        if options['backend'] == 'python':
+            self._benchmark_python(corpus, options)
+        else:
+            self._benchmark_postgres(corpus, options)
+
+    def _benchmark_python(self, corpus, options):
+        index = InvertedIndex()
+        started = time.perf_counter()
+        for resource_id in range(1, options['articles'] + 1):
+            article = corpus.article()
+            index.add(resource_id, article['title'], article['content'], article['resource_type'], article['difficulty_level'])
+        self.stdout.write(f"Indexed {len(index)} articles in {time.perf_counter() - started:.1f}s")
+
+        queries = [corpus.query() for _ in range(options['queries'])]
+        self._report(lambda query, filters, limit: index.search(query, limit, **filters), queries, options)
+
+    def _benchmark_postgres(self, corpus, options):
+        if not supports_full_text_search() or not search_index_installed():
+            raise CommandError("Run install_search_index on PostgreSQL first.")
+
+        # Everything is created inside a transaction that is rolled back afterwards.
+        with transaction.atomic():
+            started = time.perf_counter()
+            batch = []
+            for number in range(options['articles']):
+                batch.append(EducationResource(
+                    slug=f'benchmark-{options["seed"]}-{number}', is_published=True, **corpus.article()
+                ))
+                if len(batch) == 5000:
+                    EducationResource.objects.bulk_create(batch)
+                    batch = []
+            EducationResource.objects.bulk_create(batch)
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(EducationResource._meta.db_table)}')
+            self.stdout.write(f"Inserted {options['articles']} articles in {time.perf_counter() - started:.1f}s")
+
+            queries = [corpus.query() for _ in range(options['queries'])]
+            self._report(
+                lambda query, filters, limit: search_resources(query, limit=limit, **filters),
+                queries, options
+            )
+            transaction.set_rollback(True)
+
+    def _report(self, search, queries, options):
+        for number in range(1, options['passes'] + 1):
+            latencies = []
+            hits = 0
+            for query, filters in queries:
+                started = time.perf_counter()
+                results = search(query, filters, options['limit'])
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += bool(results)
+            latencies.sort()
+            self.stdout.write(
+                f"Pass {number}: {len(latencies)} queries ({hits} with results): "
+                f"p50 {_percentile(latencies, 0.50):.2f} ms, p95 {_percentile(latencies, 0.95):.2f} ms, "
+                f"p99 {_percentile(latencies, 0.99):.2f} ms, max {latencies[-1]:.2f} ms"
+            )
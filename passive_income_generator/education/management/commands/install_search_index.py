@@ -0,0 +1,16 @@
+## education/management/commands/install_search_index.py
+
+from django.core.management.base import BaseCommand, CommandError
+from education.search import supports_full_text_search, install_search_index
+
+class Command(BaseCommand):
+    help = "Add the generated tsvector column and GIN index used by education resource search (rewrites the table once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', default=None, help="Text search configuration (default: EDUCATION_SEARCH_CONFIG)")
+
+    def handle(self, *args, **options):
+        if not supports_full_text_search():
+            raise CommandError("The full-text search index requires PostgreSQL; other backends use the in-process index.")
+        install_search_index(options['config'])
+        self.stdout.write("Education search index ready.")
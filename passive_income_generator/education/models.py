@@ -1,6 +1,10 @@
 ## education/models.py
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
@@ -20,6 +24,8 @@ class EducationResource(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=250, unique=True, blank=True)
     content = models.TextField()
+    # Plain-text start of content for list representations; see education.content.
+    excerpt = models.CharField(max_length=300, blank=True)
     resource_type = models.CharField(max_length=20, choices=RESOURCE_TYPES, default='article')
     publication_date = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
@@ -35,13 +41,52 @@ class EducationResource(models.Model):
     )
     is_published = models.BooleanField(default=False)
     view_count = models.PositiveIntegerField(default=0)
+    # Maintained from ResourceRating signals; see apply_rating_changes.
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-average_rating', '-rating_count'], name='edu_resource_rating_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def apply_rating_changes(cls, changes):
+        """
+        Atomically apply {resource_id: (count delta, sum delta)} to the rating aggregates, one UPDATE per resource.
+
+        The average is derived from the updated count and sum in the same
+        statement, so it can never disagree with them.
+        """
+        for resource_id in sorted(changes):
+            count_delta, sum_delta = changes[resource_id]
+            if not count_delta and not sum_delta:
+                continue
+            count = F('rating_count') + count_delta
+            total = F('rating_sum') + sum_delta
+            cls.objects.filter(pk=resource_id).update(
+                rating_count=count,
+                rating_sum=total,
+                average_rating=Case(
+                    When(rating_count=-count_delta, then=Value(0.0)),
+                    default=Cast(total, models.FloatField()) / count,
+                    output_field=models.FloatField(),
+                ),
+            )
+
     def save(self, *args, **kwargs):
+        from .content import make_excerpt
         if not self.slug:
             self.slug = slugify(self.title)
+        if 'content' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields and 'excerpt' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'excerpt']
         super().save(*args, **kwargs)
 
     def create_resource(self):
@@ -56,8 +101,9 @@ class EducationResource(models.Model):
         self.delete()
 
     def increment_view_count(self):
-        self.view_count += 1
-        self.save()
+        # Buffered and added to view_count in bulk; see education.view_counts.
+        from .view_counts import record_view
+        record_view(self.pk)
 
 class ResourceCategory(models.Model):
     """
@@ -70,6 +116,20 @@ class ResourceCategory(models.Model):
     def __str__(self):
         return self.name
 
+class ResourceNeighbor(models.Model):
+    """
+    Precomputed item-item similarity: one of a resource's top-K most similar resources.
+    """
+    resource = models.ForeignKey(EducationResource, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(EducationResource, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('resource', 'neighbor')
+
+    def __str__(self):
+        return f"{self.neighbor_id} similar to {self.resource_id} ({self.score:.3f})"
+
 class UserProgress(models.Model):
     """
     Model to track user progress through educational resources.
@@ -77,6 +137,8 @@ class UserProgress(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='education_progress')
     resource = models.ForeignKey(EducationResource, on_delete=models.CASCADE)
     completed = models.BooleanField(default=False)
+    # Null for progress recorded before start times were kept.
+    started_at = models.DateTimeField(auto_now_add=True, null=True)
     last_accessed = models.DateTimeField(auto_now=True)
     completion_date = models.DateTimeField(null=True, blank=True)
 
@@ -87,10 +149,24 @@ class UserProgress(models.Model):
         return f"{self.user.username}'s progress on {self.resource.title}"
 
     def mark_completed(self):
+        """
+        Complete the resource and count it towards the user's learning paths, once.
+
+        The conditional UPDATE makes a repeated or concurrent completion a no-op,
+        so path progress is never counted twice.
+        """
         from django.utils import timezone
+        from .learning_paths import add_path_completions
+        now = timezone.now()
+        with transaction.atomic():
+            newly_completed = UserProgress.objects.filter(pk=self.pk, completed=False).update(
+                completed=True, completion_date=now, last_accessed=now
+            )
+            if newly_completed:
+                add_path_completions(self.user_id, self.resource_id, 1)
+                self.completion_date = now
+                self.last_accessed = now
         self.completed = True
-        self.completion_date = timezone.now()
-        self.save()
 
 class ResourceRating(models.Model):
     """
@@ -108,10 +184,39 @@ class ResourceRating(models.Model):
 
     class Meta:
         unique_together = ('user', 'resource')
+        indexes = [
+            models.Index(fields=['resource', '-created_at'], name='edu_rating_resource_new_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s rating for {self.resource.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so an update can move the resource aggregates by the difference.
+        instance._loaded_rating = (instance.__dict__.get('resource_id'), instance.__dict__.get('rating'))
+        return instance
+
+    def rating_changes(self, deleted=False):
+        """
+        Return the {resource_id: (count delta, sum delta)} that saving (or deleting) this row causes.
+        """
+        changes = {}
+
+        def add(resource_id, count_delta, sum_delta):
+            count, total = changes.get(resource_id, (0, 0))
+            changes[resource_id] = (count + count_delta, total + sum_delta)
+
+        loaded = getattr(self, '_loaded_rating', None)
+        if loaded and None not in loaded:
+            add(loaded[0], -1, -loaded[1])
+        elif deleted:
+            add(self.resource_id, -1, -self.rating)
+        if not deleted:
+            add(self.resource_id, 1, self.rating)
+        return changes
+
 class LearningPath(models.Model):
     """
     Model representing a curated learning path of educational resources.
@@ -123,6 +228,8 @@ class LearningPath(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=False)
+    # Maintained from LearningPathItem signals.
+    resource_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
@@ -142,6 +249,21 @@ class LearningPathItem(models.Model):
     def __str__(self):
         return f"{self.resource.title} in {self.learning_path.title}"
 
+class UserLearningPathProgress(models.Model):
+    """
+    Number of a learning path's resources a user has completed, kept current as resources are completed.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='learning_path_progress')
+    learning_path = models.ForeignKey(LearningPath, on_delete=models.CASCADE, related_name='user_progress')
+    completed_resources = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'learning_path')
+
+    def __str__(self):
+        return f"{self.user_id}'s progress on path {self.learning_path_id}: {self.completed_resources}"
+
 class Quiz(models.Model):
     """
     Model representing a quiz associated with an educational resource.
@@ -197,10 +319,17 @@ class UserQuizAttempt(models.Model):
         return f"{self.user.username}'s attempt at {self.quiz}"
 
     def calculate_score(self):
-        total_questions = self.quiz.questions.count()
-        correct_answers = self.answers.filter(answer__is_correct=True).count()
-        self.score = (correct_answers / total_questions) * 100
-        self.passed = self.score >= self.quiz.pass_score
+        """
+        Re-grade the stored answers against the quiz's answer key; submissions are graded before they are saved.
+        """
+        from .quiz_grading import get_answer_key, score_answers
+        answer_key = get_answer_key(self.quiz_id)
+        answers = [
+            (question_id, answer_id)
+            for question_id, answer_id in self.answers.values_list('question_id', 'answer_id')
+            if question_id in answer_key['questions']
+        ]
+        self.score, self.passed = score_answers(answer_key, answers)
         self.save()
 
 class UserQuizAnswer(models.Model):
@@ -216,3 +345,140 @@ class UserQuizAnswer(models.Model):
 
     def __str__(self):
         return f"{self.attempt.user.username}'s answer to {self.question}"
+
+class ResourceEngagement(models.Model):
+    """
+    Nightly engagement summary for one resource; see education.engagement.
+    """
+    resource = models.OneToOneField(EducationResource, on_delete=models.CASCADE, primary_key=True, related_name='engagement')
+    learners = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    completion_rate = models.FloatField(default=0)
+    average_seconds_to_complete = models.FloatField(null=True, blank=True)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_pass_rate = models.FloatField(null=True, blank=True)
+    quiz_average_score = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Engagement for resource {self.resource_id}"
+
+class LearningPathEngagement(models.Model):
+    """
+    Nightly engagement summary for one learning path; see education.engagement.
+    """
+    learning_path = models.OneToOneField(LearningPath, on_delete=models.CASCADE, primary_key=True, related_name='engagement')
+    learners = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    completion_rate = models.FloatField(default=0)
+    average_seconds_to_complete = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Engagement for learning path {self.learning_path_id}"
+
+class QuizQuestionStats(models.Model):
+    """
+    Nightly difficulty statistics for one quiz question; see education.engagement.
+    """
+    question = models.OneToOneField(QuizQuestion, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='question_stats')
+    responses = models.PositiveIntegerField(default=0)
+    correct_rate = models.FloatField(null=True, blank=True)
+    discrimination = models.FloatField(null=True, blank=True, help_text="Correlation of a correct answer with the attempt score")
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Statistics for question {self.question_id}"
+
+@receiver([post_save, post_delete], sender=EducationResource)
+def reindex_resource(sender, instance, **kwargs):
+    from .search import resources_changed
+    resources_changed([instance.pk])
+
+@receiver(m2m_changed, sender=ResourceCategory.resources.through)
+def reindex_recategorised_resources(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .search import resources_changed
+    if reverse:
+        resources_changed([instance.pk])
+    else:
+        # post_clear from the category side does not report which resources were affected.
+        resources_changed(list(pk_set) if pk_set is not None else None)
+
+@receiver([post_save, post_delete], sender=EducationResource)
+def refresh_resource_typeahead(sender, instance, **kwargs):
+    from .typeahead import RESOURCE, items_changed
+    items_changed(RESOURCE, [instance.pk])
+
+@receiver([post_save, post_delete], sender=ResourceCategory)
+def refresh_category_typeahead(sender, instance, **kwargs):
+    from .typeahead import CATEGORY, items_changed
+    items_changed(CATEGORY, [instance.pk])
+
+@receiver(post_save, sender=ResourceRating)
+def add_rating_to_resource(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        instance._loaded_rating = None
+    EducationResource.apply_rating_changes(instance.rating_changes())
+    instance._loaded_rating = (instance.resource_id, instance.rating)
+
+@receiver(post_delete, sender=ResourceRating)
+def remove_rating_from_resource(sender, instance, **kwargs):
+    EducationResource.apply_rating_changes(instance.rating_changes(deleted=True))
+
+@receiver([post_save, post_delete], sender=LearningPath)
+def drop_learning_path_document(sender, instance, **kwargs):
+    from .learning_paths import invalidate_learning_paths
+    invalidate_learning_paths([instance.pk])
+
+@receiver([post_save, post_delete], sender=LearningPathItem)
+def drop_document_of_item_path(sender, instance, **kwargs):
+    from .learning_paths import invalidate_learning_paths
+    invalidate_learning_paths([instance.learning_path_id])
+
+@receiver([post_save, post_delete], sender=EducationResource)
+def drop_documents_of_resource_paths(sender, instance, **kwargs):
+    from .learning_paths import invalidate_paths_containing
+    invalidate_paths_containing(instance.pk)
+
+@receiver(post_save, sender=UserProgress)
+def count_completed_progress(sender, instance, created, raw=False, **kwargs):
+    # Later completions go through mark_completed; other edits are left to the rebuild job.
+    if created and instance.completed and not raw:
+        from .learning_paths import add_path_completions
+        add_path_completions(instance.user_id, instance.resource_id, 1)
+
+@receiver(post_delete, sender=UserProgress)
+def uncount_completed_progress(sender, instance, **kwargs):
+    if instance.completed:
+        from .learning_paths import add_path_completions
+        add_path_completions(instance.user_id, instance.resource_id, -1)
+
+@receiver([post_save, post_delete], sender=LearningPathItem)
+def recount_learning_path(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .learning_paths import learning_path_membership_changed
+    learning_path_membership_changed(instance.learning_path_id)
+
+@receiver([post_save, post_delete], sender=Quiz)
+def drop_quiz_answer_key(sender, instance, **kwargs):
+    from .quiz_grading import invalidate_answer_key
+    invalidate_answer_key(instance.pk)
+
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def drop_answer_key_of_question_quiz(sender, instance, **kwargs):
+    from .quiz_grading import invalidate_answer_key
+    invalidate_answer_key(instance.quiz_id)
+
+@receiver([post_save, post_delete], sender=QuizAnswer)
+def drop_answer_key_of_answer_quiz(sender, instance, **kwargs):
+    from .quiz_grading import invalidate_answer_key
+    # When deleted along with its question, the question's own signal drops the key.
+    quiz_id = QuizQuestion.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        invalidate_answer_key(quiz_id)
@@ -0,0 +1,106 @@
+## education/quiz_grading.py
+
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Quiz, QuizQuestion, UserQuizAnswer, UserQuizAttempt
+
+ANSWER_KEY_CACHE_KEY = 'quiz-answer-key:{quiz_id}:{version}'
+ANSWER_KEY_VERSION_KEY = 'quiz-answer-key-version:{quiz_id}'
+
+def answer_key_cache_key(quiz_id, version):
+    return ANSWER_KEY_CACHE_KEY.format(quiz_id=quiz_id, version=version)
+
+def _answer_key_version(quiz_id):
+    version_key = ANSWER_KEY_VERSION_KEY.format(quiz_id=quiz_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(version_key)
+    return version
+
+def load_answer_key(quiz_id):
+    """
+    Load {'pass_score', 'questions': {question id: ({answer ids}, {correct answer ids})}} in one query, or None.
+    """
+    rows = list(
+        QuizQuestion.objects.filter(quiz_id=quiz_id)
+        .values_list('quiz__pass_score', 'id', 'answers__id', 'answers__is_correct')
+    )
+    if not rows:
+        pass_score = Quiz.objects.filter(pk=quiz_id).values_list('pass_score', flat=True).first()
+        return None if pass_score is None else {'pass_score': pass_score, 'questions': {}}
+
+    questions = {}
+    for pass_score, question_id, answer_id, is_correct in rows:
+        answer_ids, correct_ids = questions.setdefault(question_id, (set(), set()))
+        if answer_id is not None:
+            answer_ids.add(answer_id)
+            if is_correct:
+                correct_ids.add(answer_id)
+    return {'pass_score': pass_score, 'questions': questions}
+
+def get_answer_key(quiz_id):
+    """
+    Return the quiz's cached answer key, loading it on a miss; None if the quiz does not exist.
+
+    Keys are cached under the quiz's current version, which a committed edit
+    to the quiz, a question or an answer replaces, so a key loaded before the
+    edit committed is never read again. Other processes only see the new
+    version through a shared cache (see QUIZ_ANSWER_KEY_CACHE_TIMEOUT).
+    """
+    key = answer_key_cache_key(quiz_id, _answer_key_version(quiz_id))
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = load_answer_key(quiz_id)
+        if answer_key is not None:
+            cache.set(key, answer_key, settings.QUIZ_ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_key
+
+def invalidate_answer_key(quiz_id):
+    """
+    Move the quiz to a new answer key version once the current transaction commits.
+    """
+    version_key = ANSWER_KEY_VERSION_KEY.format(quiz_id=quiz_id)
+    transaction.on_commit(lambda: cache.set(version_key, uuid.uuid4().hex, timeout=None))
+
+def invalid_answers(answer_key, answers):
+    """
+    Return error messages for (question id, answer id) pairs that do not fit the answer key.
+    """
+    errors = []
+    seen = set()
+    for question_id, answer_id in answers:
+        question = answer_key['questions'].get(question_id)
+        if question is None:
+            errors.append(f"Question {question_id} is not part of this quiz.")
+        elif answer_id not in question[0]:
+            errors.append(f"Answer {answer_id} does not belong to question {question_id}.")
+        elif question_id in seen:
+            errors.append(f"Question {question_id} is answered more than once.")
+        seen.add(question_id)
+    return errors
+
+def score_answers(answer_key, answers):
+    """
+    Return (score percentage rounded down, passed) for validated (question id, answer id) pairs.
+    """
+    total = len(answer_key['questions'])
+    if not total:
+        return 0, False
+    correct = sum(1 for question_id, answer_id in answers if answer_id in answer_key['questions'][question_id][1])
+    return correct * 100 // total, correct * 100 >= answer_key['pass_score'] * total
+
+def submit_quiz(user, quiz_id, answer_key, answers):
+    """
+    Record a graded attempt and all of its answers in one transaction: one INSERT for the attempt, one for the answers.
+    """
+    score, passed = score_answers(answer_key, answers)
+    with transaction.atomic():
+        attempt = UserQuizAttempt.objects.create(user=user, quiz_id=quiz_id, score=score, passed=passed)
+        UserQuizAnswer.objects.bulk_create([
+            UserQuizAnswer(attempt=attempt, question_id=question_id, answer_id=answer_id)
+            for question_id, answer_id in answers
+        ])
+    return attempt
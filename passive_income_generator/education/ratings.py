@@ -0,0 +1,49 @@
+## education/ratings.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from .models import EducationResource, ResourceRating
+
+def reconcile_rating_aggregates(batch_size=None):
+    """
+    Repair resource rating aggregates that drifted from their ResourceRating rows.
+
+    Bulk writes (queryset.update, bulk_create) skip the signals that keep the
+    aggregates current. Each batch locks its resources before counting, so a
+    concurrent rating waits and is applied on top of the corrected values.
+    Returns the number of resources repaired.
+    """
+    batch_size = batch_size or settings.RATING_RECONCILE_BATCH_SIZE
+    repaired = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            resources = list(
+                EducationResource.objects.select_for_update()
+                .filter(pk__gt=last_pk)
+                .only('id', 'rating_count', 'rating_sum', 'average_rating')
+                .order_by('pk')[:batch_size]
+            )
+            if not resources:
+                return repaired
+            last_pk = resources[-1].pk
+
+            totals = {
+                resource_id: (count, total)
+                for resource_id, count, total in ResourceRating.objects
+                .filter(resource_id__in=[resource.pk for resource in resources])
+                .values('resource_id')
+                .annotate(count=Count('id'), total=Sum('rating'))
+                .values_list('resource_id', 'count', 'total')
+            }
+            drifted = []
+            for resource in resources:
+                count, total = totals.get(resource.pk, (0, 0))
+                average = total / count if count else 0
+                if (resource.rating_count, resource.rating_sum, resource.average_rating) != (count, total, average):
+                    resource.rating_count, resource.rating_sum, resource.average_rating = count, total, average
+                    drifted.append(resource)
+            if drifted:
+                EducationResource.objects.bulk_update(drifted, ['rating_count', 'rating_sum', 'average_rating'])
+            repaired += len(drifted)
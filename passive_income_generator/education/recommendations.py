@@ -0,0 +1,147 @@
+## education/recommendations.py
+
+import heapq
+from collections import defaultdict
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+from .content import summaries
+from .models import ResourceNeighbor, ResourceRating, UserProgress
+
+# Implicit feedback strength of each interaction, between 0 and 1.
+STARTED_WEIGHT = 0.5
+COMPLETED_WEIGHT = 1.0
+
+def _rating_weight(rating):
+    return rating / 5
+
+def _progress_weight(completed):
+    return COMPLETED_WEIGHT if completed else STARTED_WEIGHT
+
+def _sparse_interactions(rows, users, resources):
+    user_ids, resource_ids, weights = rows
+    return sparse.csr_matrix(
+        (weights, (np.searchsorted(users, user_ids), np.searchsorted(resources, resource_ids))),
+        shape=(len(users), len(resources)),
+    )
+
+def _columns(queryset, fields, weight):
+    values = list(queryset.order_by().values_list(*fields).iterator())
+    if not values:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    user_ids, resource_ids, raw = zip(*values)
+    return (np.fromiter(user_ids, dtype=np.int64, count=len(values)),
+            np.fromiter(resource_ids, dtype=np.int64, count=len(values)),
+            np.fromiter((weight(value) for value in raw), dtype=np.float64, count=len(values)))
+
+def interaction_matrix():
+    """
+    Return (users x resources CSR matrix, resource ids) of every user's strongest interaction with each resource.
+
+    A completion counts fully, a started resource half, a rating by its stars.
+    """
+    progress = _columns(UserProgress.objects.all(), ('user_id', 'resource_id', 'completed'), _progress_weight)
+    ratings = _columns(ResourceRating.objects.all(), ('user_id', 'resource_id', 'rating'), _rating_weight)
+    users = np.unique(np.concatenate([progress[0], ratings[0]]))
+    resources = np.unique(np.concatenate([progress[1], ratings[1]]))
+    matrix = _sparse_interactions(progress, users, resources).maximum(_sparse_interactions(ratings, users, resources))
+    return matrix.tocsr(), resources
+
+def top_neighbors(matrix, top_k, block_size):
+    """
+    Yield (resource index, neighbor index, cosine similarity) for each resource's top_k co-occurring resources.
+
+    Similarities are computed a block of resources at a time, so only
+    block_size rows of the item-item matrix are ever held in memory.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalized = (matrix @ sparse.diags(1 / norms)).tocsc()
+    by_resource = normalized.T.tocsr()
+
+    for block_start in range(0, by_resource.shape[0], block_size):
+        similarities = (by_resource[block_start:block_start + block_size] @ normalized).tocsr()
+        for row in range(similarities.shape[0]):
+            resource = block_start + row
+            begin, end = similarities.indptr[row], similarities.indptr[row + 1]
+            neighbors = similarities.indices[begin:end]
+            scores = similarities.data[begin:end]
+            keep = neighbors != resource
+            neighbors, scores = neighbors[keep], scores[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                neighbors, scores = neighbors[best], scores[best]
+            for neighbor, score in zip(neighbors.tolist(), scores.tolist()):
+                yield resource, neighbor, score
+
+def rebuild_resource_neighbors(top_k=None, block_size=None):
+    """
+    Recompute every resource's top-K similar resources from co-occurring user interactions.
+
+    The whole table is replaced in one transaction, so readers see either the
+    previous or the new neighbor lists. Returns the number of rows written.
+    """
+    top_k = top_k or settings.RECOMMENDATION_NEIGHBORS
+    block_size = block_size or settings.RECOMMENDATION_BLOCK_SIZE
+    matrix, resource_ids = interaction_matrix()
+    ids = resource_ids.tolist()
+    neighbors = [
+        ResourceNeighbor(resource_id=ids[resource], neighbor_id=ids[neighbor], score=score)
+        for resource, neighbor, score in top_neighbors(matrix, top_k, block_size)
+    ]
+    with transaction.atomic():
+        ResourceNeighbor.objects.all().delete()
+        ResourceNeighbor.objects.bulk_create(neighbors, batch_size=5000)
+    return len(neighbors)
+
+def _user_seeds(user, max_seeds):
+    """
+    Return {resource id: interaction weight} for the user's most recent interactions.
+    """
+    seeds = {}
+    progress = (
+        UserProgress.objects.filter(user=user)
+        .order_by('-last_accessed')
+        .values_list('resource_id', 'completed')[:max_seeds]
+    )
+    for resource_id, is_completed in progress:
+        seeds[resource_id] = _progress_weight(is_completed)
+    ratings = (
+        ResourceRating.objects.filter(user=user)
+        .order_by('-updated_at')
+        .values_list('resource_id', 'rating')[:max_seeds]
+    )
+    for resource_id, rating in ratings:
+        seeds[resource_id] = max(seeds.get(resource_id, 0), _rating_weight(rating))
+    return seeds
+
+def recommend_resources(user, limit=5):
+    """
+    Return up to limit (resource, relevance score) pairs of published resources the user has not completed.
+
+    Each resource the user interacted with votes for its stored neighbors,
+    weighted by how strongly the user engaged with it; users without history
+    (or too little of it) get the most viewed resources with a score of 0.
+    """
+    seeds = _user_seeds(user, settings.RECOMMENDATION_MAX_SEEDS)
+    # Every completed resource is excluded, not just those among the recent seeds.
+    completed = set(UserProgress.objects.filter(user=user, completed=True).values_list('resource_id', flat=True))
+    scores = defaultdict(float)
+    neighbors = ResourceNeighbor.objects.filter(resource_id__in=list(seeds)).values_list('resource_id', 'neighbor_id', 'score')
+    for resource_id, neighbor_id, score in neighbors:
+        if neighbor_id not in completed:
+            scores[neighbor_id] += seeds[resource_id] * score
+
+    published = summaries().filter(is_published=True)
+    candidates = published.in_bulk(list(scores)) if scores else {}
+    best = heapq.nlargest(limit, candidates, key=lambda resource_id: (scores[resource_id], -resource_id))
+    recommendations = [(candidates[resource_id], scores[resource_id]) for resource_id in best]
+
+    if len(recommendations) < limit:
+        popular = (
+            published.exclude(pk__in=completed.union(best))
+            .order_by('-view_count', '-publication_date')[:limit - len(recommendations)]
+        )
+        recommendations.extend((resource, 0.0) for resource in popular)
+    return recommendations
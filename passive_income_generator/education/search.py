@@ -0,0 +1,368 @@
+## education/search.py
+
+import heapq
+from bisect import bisect_left
+import logging
+import math
+import re
+from array import array
+from collections import OrderedDict
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from .content import summaries
+from .index_sync import ChangeLog, LiveIndex
+from .models import EducationResource, ResourceCategory
+
+logger = logging.getLogger(__name__)
+
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_INDEX_NAME = 'education_resource_search_idx'
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+def supports_full_text_search():
+    return connection.vendor == 'postgresql'
+
+_search_index_installed = None
+
+def search_index_installed():
+    global _search_index_installed
+    if _search_index_installed is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+                [EducationResource._meta.db_table, SEARCH_VECTOR_COLUMN]
+            )
+            _search_index_installed = cursor.fetchone() is not None
+    return _search_index_installed
+
+def install_search_index(config=None):
+    """
+    Add the weighted tsvector column (title 'A', content 'B') and its GIN index.
+
+    The column is GENERATED ... STORED, so PostgreSQL keeps it current on every
+    INSERT and UPDATE with no extra statements from Django. Adding it rewrites
+    the table once. Requires PostgreSQL 12+.
+    """
+    global _search_index_installed
+    config = config or settings.EDUCATION_SEARCH_CONFIG
+    table = _quote(EducationResource._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {_quote(SEARCH_VECTOR_COLUMN)} tsvector "
+            f"GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector(%s::regconfig, coalesce(content, '')), 'B')"
+            f") STORED",
+            [config, config]
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {_quote(SEARCH_INDEX_NAME)} ON {table} "
+            f"USING GIN ({_quote(SEARCH_VECTOR_COLUMN)})"
+        )
+    _search_index_installed = True
+
+def _postgres_search(query, filters, limit):
+    # Imported here so SQLite runs do not need psycopg2.
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+    vector = RawSQL(
+        f'{_quote(EducationResource._meta.db_table)}.{_quote(SEARCH_VECTOR_COLUMN)}', [],
+        output_field=SearchVectorField()
+    )
+    search_query = SearchQuery(query, config=settings.EDUCATION_SEARCH_CONFIG, search_type='websearch')
+    queryset = (
+        summaries()
+        .annotate(document=vector, search_rank=SearchRank(vector, search_query))
+        .filter(document=search_query, is_published=True, **filters)
+        .order_by('-search_rank', '-view_count', 'pk')
+    )
+    return list(queryset[:limit])
+
+# Pure-Python fallback for backends without full-text search (SQLite test runs).
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for from has have how i if in into is it its of on or so that the their '
+    'then there these this to was what when where which who why will with you your'.split()
+)
+
+def _stem(token):
+    # Light suffix stripping so 'investing', 'invested' and 'investments' meet 'invest'.
+    for suffix in ('ments', 'ment', 'ings', 'ing', 'ies', 'ed', 'es', 's'):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)] + ('y' if suffix == 'ies' else '')
+    return token
+
+def tokenize(text):
+    return [_stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+class InvertedIndex:
+    """
+    Append-only inverted index over resource titles and content, ranked with BM25.
+
+    Postings are parallel arrays of internal document numbers (ascending) and
+    weighted term frequencies; title terms count TITLE_WEIGHT times.
+    Re-indexing a resource retires its old document number; once more than a
+    fifth of the numbers are retired the owner should rebuild the index.
+
+    Queries walk the rarest term's postings in descending score order (cached
+    per term until its posting list grows) and stop as soon as no remaining
+    document can enter the top results, even with the best possible score
+    from every other term.
+    """
+    TITLE_WEIGHT = 3
+    K1 = 1.2
+    B = 0.75
+    IMPACT_CACHE_SIZE = 4000000  # cached postings across terms, 12 bytes each
+
+    def __init__(self):
+        self.postings = {}
+        self.resource_ids = array('q')
+        self.lengths = array('f')
+        self.resource_types = []
+        self.difficulty_levels = array('b')
+        self.categories = {}
+        self.current = {}
+        self.total_length = 0.0
+        self.version = None
+        self._impacts = OrderedDict()
+        self._impact_entries = 0
+
+    def __len__(self):
+        return len(self.current)
+
+    @property
+    def needs_rebuild(self):
+        return len(self.resource_ids) > 1000 and len(self.current) < 0.8 * len(self.resource_ids)
+
+    def add(self, resource_id, title, content, resource_type, difficulty_level, category_ids=()):
+        self.remove(resource_id)
+        doc = len(self.resource_ids)
+        frequencies = {}
+        for token in tokenize(title):
+            frequencies[token] = frequencies.get(token, 0) + self.TITLE_WEIGHT
+        for token in tokenize(content):
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, frequency in frequencies.items():
+            entry = self.postings.get(token)
+            if entry is None:
+                entry = self.postings[token] = (array('q'), array('f'))
+            entry[0].append(doc)
+            entry[1].append(frequency)
+
+        length = float(sum(frequencies.values()))
+        self.resource_ids.append(resource_id)
+        self.lengths.append(length)
+        self.resource_types.append(resource_type)
+        self.difficulty_levels.append(difficulty_level)
+        if category_ids:
+            self.categories[doc] = frozenset(category_ids)
+        self.current[resource_id] = doc
+        self.total_length += length
+
+    def remove(self, resource_id):
+        doc = self.current.pop(resource_id, None)
+        if doc is not None:
+            self.total_length -= self.lengths[doc]
+            self.categories.pop(doc, None)
+
+    def _matches(self, doc, resource_type, difficulty_level, category_id):
+        if self.current.get(self.resource_ids[doc]) != doc:
+            return False
+        if resource_type is not None and self.resource_types[doc] != resource_type:
+            return False
+        if difficulty_level is not None and self.difficulty_levels[doc] != difficulty_level:
+            return False
+        if category_id is not None and category_id not in self.categories.get(doc, ()):
+            return False
+        return True
+
+    def _idf(self, document_frequency):
+        # Posting lists still hold retired documents, so count those too.
+        count = len(self.resource_ids)
+        return math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _score(self, idf, frequency, doc, average_length):
+        norm = self.K1 * (1 - self.B + self.B * self.lengths[doc] / average_length)
+        return idf * frequency * (self.K1 + 1) / (frequency + norm)
+
+    def _impact_order(self, term, docs, frequencies, average_length):
+        """
+        The term's postings sorted by score, best first, as (scores, docs) arrays.
+        """
+        cached = self._impacts.get(term)
+        if cached is not None and cached[0] == len(docs):
+            self._impacts.move_to_end(term)
+            return cached[1], cached[2]
+
+        # _score() inlined: this runs over every posting of the term.
+        scale = self._idf(len(docs)) * (self.K1 + 1)
+        base = self.K1 * (1 - self.B)
+        slope = self.K1 * self.B / average_length
+        lengths = self.lengths
+        raw_scores = [scale * frequency / (frequency + base + slope * lengths[doc]) for doc, frequency in zip(docs, frequencies)]
+        order = sorted(range(len(raw_scores)), key=raw_scores.__getitem__, reverse=True)
+        scores = array('d', (raw_scores[position] for position in order))
+        ordered_docs = array('i', (docs[position] for position in order))
+
+        if cached is not None:
+            self._impact_entries -= cached[0]
+        self._impacts[term] = (len(docs), scores, ordered_docs)
+        self._impact_entries += len(docs)
+        while self._impact_entries > self.IMPACT_CACHE_SIZE and len(self._impacts) > 1:
+            _, (size, _, _) = self._impacts.popitem(last=False)
+            self._impact_entries -= size
+        return scores, ordered_docs
+
+    def search(self, query, limit, resource_type=None, difficulty_level=None, category_id=None):
+        """
+        Return up to limit (resource_id, score) pairs matching every query term, best first.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.current:
+            return []
+        entries = []
+        for term in terms:
+            entry = self.postings.get(term)
+            if entry is None:
+                return []
+            entries.append((term, entry[0], entry[1]))
+        entries.sort(key=lambda entry: len(entry[1]))
+
+        average_length = self.total_length / len(self.current)
+        term, docs, frequencies = entries[0]
+        driver_scores, driver_docs = self._impact_order(term, docs, frequencies, average_length)
+
+        others = []
+        remaining_max = 0.0
+        for term, docs, frequencies in entries[1:]:
+            others.append((self._idf(len(docs)), docs, frequencies))
+            # The best score any document gets from this term bounds what it can still add.
+            remaining_max += self._impact_order(term, docs, frequencies, average_length)[0][0]
+
+        best = []
+        for driver_score, doc in zip(driver_scores, driver_docs):
+            if len(best) == limit and driver_score + remaining_max <= best[0][0]:
+                break
+            if not self._matches(doc, resource_type, difficulty_level, category_id):
+                continue
+            total = driver_score
+            for idf, docs, frequencies in others:
+                position = bisect_left(docs, doc)
+                if position == len(docs) or docs[position] != doc:
+                    break
+                total += self._score(idf, frequencies[position], doc, average_length)
+            else:
+                if len(best) < limit:
+                    heapq.heappush(best, (total, -doc))
+                elif total > best[0][0]:
+                    heapq.heapreplace(best, (total, -doc))
+
+        return [(self.resource_ids[-doc], round(score, 4)) for score, doc in sorted(best, reverse=True)]
+
+SEARCH_VERSION_KEY = 'education-search-version'
+
+def _category_map(resource_ids=None):
+    through = ResourceCategory.resources.through.objects.all()
+    if resource_ids is not None:
+        through = through.filter(educationresource_id__in=resource_ids)
+    categories = {}
+    for resource_id, category_id in through.values_list('educationresource_id', 'resourcecategory_id'):
+        categories.setdefault(resource_id, set()).add(category_id)
+    return categories
+
+INDEXED_FIELDS = ('id', 'title', 'content', 'resource_type', 'difficulty_level')
+
+def _index_rows(index, rows, categories):
+    for resource_id, title, content, resource_type, difficulty_level in rows:
+        index.add(resource_id, title, content, resource_type, difficulty_level, categories.get(resource_id, ()))
+
+def build_index():
+    # Drafts are never indexed, so they cannot be found by their title or content.
+    index = InvertedIndex()
+    rows = EducationResource.objects.filter(is_published=True).order_by('pk').values_list(*INDEXED_FIELDS)
+    _index_rows(index, rows.iterator(), _category_map())
+    return index
+
+def _load_changes(entries):
+    resource_ids = sorted({resource_id for entry in entries for resource_id in entry})
+    # Unpublished resources load no row, so applying the change drops them from the index.
+    rows = list(
+        EducationResource.objects.filter(pk__in=resource_ids, is_published=True).values_list(*INDEXED_FIELDS)
+    )
+    return resource_ids, rows, _category_map(resource_ids)
+
+def _apply_changes(index, loaded):
+    resource_ids, rows, categories = loaded
+    for resource_id in resource_ids:
+        index.remove(resource_id)
+    _index_rows(index, rows, categories)
+
+live_index = LiveIndex(ChangeLog(SEARCH_VERSION_KEY), build_index, _load_changes, _apply_changes, name='search index')
+
+def resources_changed(resource_ids):
+    """
+    Record, once the transaction commits, that resources were saved, deleted or recategorised.
+
+    This process patches its index straight away; others replay the change in
+    the background. None means the affected resources are unknown, and every
+    process rebuilds in the background.
+    """
+    live_index.changed(list(resource_ids) if resource_ids is not None else None)
+
+def _python_search(query, filters, limit):
+    ranked = live_index.query(lambda index: index.search(
+        query, limit,
+        resource_type=filters.get('resource_type'),
+        difficulty_level=filters.get('difficulty_level'),
+        category_id=filters.get('categories'),
+    ))
+    resources = summaries().filter(is_published=True).in_bulk([resource_id for resource_id, _ in ranked])
+    results = []
+    for resource_id, rank in ranked:
+        resource = resources.get(resource_id)
+        if resource is not None:
+            resource.search_rank = rank
+            results.append(resource)
+    return results
+
+_warned_missing_index = False
+
+def search_backend():
+    global _warned_missing_index
+    backend = settings.EDUCATION_SEARCH_BACKEND
+    if backend != 'auto':
+        return backend
+    if not supports_full_text_search():
+        return 'python'
+    if search_index_installed():
+        return 'postgres'
+    if not _warned_missing_index:
+        _warned_missing_index = True
+        logger.error(
+            "PostgreSQL search index is not installed; serving education search from the in-process index. "
+            "Run manage.py install_search_index, or set EDUCATION_SEARCH_BACKEND=python to silence this."
+        )
+    return 'python'
+
+def search_resources(query, resource_type=None, difficulty_level=None, category_id=None, limit=None):
+    """
+    Ranked full-text search over published resources' titles and content, best match first.
+
+    Each returned resource carries a search_rank attribute.
+    """
+    limit = limit or settings.EDUCATION_SEARCH_MAX_RESULTS
+    filters = {}
+    if resource_type is not None:
+        filters['resource_type'] = resource_type
+    if difficulty_level is not None:
+        filters['difficulty_level'] = difficulty_level
+    if category_id is not None:
+        filters['categories'] = category_id
+
+    if search_backend() == 'postgres':
+        return _postgres_search(query, filters, limit)
+    return _python_search(query, filters, limit)
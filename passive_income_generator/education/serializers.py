@@ -1,10 +1,14 @@
 ## education/serializers.py
 
 from rest_framework import serializers
+from django.conf import settings
+from .content import SUMMARY_FIELDS
+from .learning_paths import progress_percentage
+from .quiz_grading import get_answer_key, invalid_answers
 from .models import (
     EducationResource, ResourceCategory, UserProgress, ResourceRating,
     LearningPath, LearningPathItem, Quiz, QuizQuestion, QuizAnswer,
-    UserQuizAttempt, UserQuizAnswer
+    UserQuizAttempt, UserQuizAnswer, ResourceEngagement, LearningPathEngagement, QuizQuestionStats
 )
 from django.contrib.auth import get_user_model
 
@@ -13,10 +17,11 @@ User = get_user_model()
 class EducationResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = EducationResource
-        fields = ['id', 'title', 'slug', 'content', 'resource_type', 'publication_date',
+        fields = ['id', 'title', 'slug', 'content', 'excerpt', 'resource_type', 'publication_date',
                   'last_updated', 'author', 'difficulty_level', 'estimated_reading_time',
-                  'is_published', 'view_count']
-        read_only_fields = ['slug', 'publication_date', 'last_updated', 'view_count']
+                  'is_published', 'view_count', 'rating_count', 'average_rating']
+        read_only_fields = ['slug', 'excerpt', 'publication_date', 'last_updated', 'view_count', 'rating_count',
+                            'average_rating']
 
     def create(self, validated_data):
         return EducationResource.objects.create(**validated_data)
@@ -24,9 +29,25 @@ class EducationResourceSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        # view_count and the rating aggregates are maintained by atomic increments; never write back a stale copy.
+        instance.save(update_fields=[*validated_data, 'last_updated'])
         return instance
 
+class EducationResourceSummarySerializer(serializers.ModelSerializer):
+    """
+    List representation: an excerpt instead of the body. Pair with education.content.summaries().
+    """
+    class Meta:
+        model = EducationResource
+        fields = SUMMARY_FIELDS
+        read_only_fields = SUMMARY_FIELDS
+
+class EducationResourceSearchResultSerializer(EducationResourceSummarySerializer):
+    search_rank = serializers.FloatField(read_only=True)
+
+    class Meta(EducationResourceSummarySerializer.Meta):
+        fields = EducationResourceSummarySerializer.Meta.fields + ['search_rank']
+
 class ResourceCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ResourceCategory
@@ -54,8 +75,8 @@ class LearningPathSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LearningPath
-        fields = ['id', 'title', 'description', 'resources', 'created_by', 'created_at', 'updated_at', 'is_published']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'title', 'description', 'resources', 'resource_count', 'created_by', 'created_at', 'updated_at', 'is_published']
+        read_only_fields = ['resource_count', 'created_at', 'updated_at']
 
 class QuizAnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -90,12 +111,38 @@ class UserQuizAttemptSerializer(serializers.ModelSerializer):
         read_only_fields = ['score', 'passed', 'attempt_date']
 
 class EducationResourceDetailSerializer(EducationResourceSerializer):
+    """
+    Resource detail with one page of its newest ratings.
+
+    The page starts at the 'ratings_offset' context value and holds
+    'ratings_limit' ratings; ratings_next_offset is null on the last page.
+    """
     categories = ResourceCategorySerializer(many=True, read_only=True)
-    ratings = ResourceRatingSerializer(many=True, read_only=True)
+    ratings = serializers.SerializerMethodField()
+    ratings_next_offset = serializers.SerializerMethodField()
     quiz = QuizSerializer(read_only=True)
 
     class Meta(EducationResourceSerializer.Meta):
-        fields = EducationResourceSerializer.Meta.fields + ['categories', 'ratings', 'quiz']
+        fields = EducationResourceSerializer.Meta.fields + ['categories', 'ratings', 'ratings_next_offset', 'quiz']
+
+    def _ratings_page(self, obj):
+        page = getattr(self, '_ratings_page_cache', None)
+        if page is None or page[0] != obj.pk:
+            offset = self.context.get('ratings_offset', 0)
+            limit = self.context.get('ratings_limit', settings.RESOURCE_RATINGS_PAGE_SIZE)
+            ratings = list(
+                ResourceRating.objects.filter(resource=obj)
+                .order_by('-created_at', '-id')[offset:offset + limit + 1]
+            )
+            next_offset = offset + limit if len(ratings) > limit else None
+            page = self._ratings_page_cache = (obj.pk, ratings[:limit], next_offset)
+        return page
+
+    def get_ratings(self, obj):
+        return ResourceRatingSerializer(self._ratings_page(obj)[1], many=True).data
+
+    def get_ratings_next_offset(self, obj):
+        return self._ratings_page(obj)[2]
 
 class UserEducationProgressSerializer(serializers.ModelSerializer):
     progress = UserProgressSerializer(many=True, read_only=True)
@@ -113,8 +160,8 @@ class LearningPathDetailSerializer(LearningPathSerializer):
         fields = LearningPathSerializer.Meta.fields
 
     def get_resources(self, obj):
-        items = LearningPathItem.objects.filter(learning_path=obj).order_by('order')
-        return [EducationResourceSerializer(item.resource).data for item in items]
+        # Served from learningpathitem_set prefetched with its resources (see learning_paths_with_items).
+        return EducationResourceSummarySerializer([item.resource for item in obj.learningpathitem_set.all()], many=True).data
 
 class QuizSubmissionSerializer(serializers.Serializer):
     quiz_id = serializers.IntegerField()
@@ -124,22 +171,31 @@ class QuizSubmissionSerializer(serializers.Serializer):
         )
     )
 
-    def validate_quiz_id(self, value):
-        try:
-            return Quiz.objects.get(pk=value)
-        except Quiz.DoesNotExist:
-            raise serializers.ValidationError("Invalid quiz ID")
-
     def validate_answers(self, value):
         if not isinstance(value, list):
             raise serializers.ValidationError("Answers must be a list")
         for answer in value:
             if not isinstance(answer, dict) or 'question_id' not in answer or 'answer_id' not in answer:
                 raise serializers.ValidationError("Each answer must be a dictionary with 'question_id' and 'answer_id'")
-        return value
+        return [(answer['question_id'], answer['answer_id']) for answer in value]
+
+    def validate(self, data):
+        """
+        Check every answer against the quiz's cached answer key, so validation needs no per-answer query.
+        """
+        answer_key = get_answer_key(data['quiz_id'])
+        if answer_key is None:
+            raise serializers.ValidationError({'quiz_id': "Invalid quiz ID"})
+        if not answer_key['questions']:
+            raise serializers.ValidationError({'quiz_id': "This quiz has no questions"})
+        errors = invalid_answers(answer_key, data['answers'])
+        if errors:
+            raise serializers.ValidationError({'answers': errors})
+        data['answer_key'] = answer_key
+        return data
 
 class ResourceRecommendationSerializer(serializers.Serializer):
-    resource = EducationResourceSerializer(read_only=True)
+    resource = EducationResourceSummarySerializer(read_only=True)
     relevance_score = serializers.FloatField()
 
 class UserLearningPathProgressSerializer(serializers.Serializer):
@@ -147,3 +203,39 @@ class UserLearningPathProgressSerializer(serializers.Serializer):
     completed_resources = serializers.IntegerField()
     total_resources = serializers.IntegerField()
     progress_percentage = serializers.FloatField()
+
+class LearningPathProgressSerializer(serializers.Serializer):
+    learning_path_id = serializers.IntegerField(source='id')
+    title = serializers.CharField()
+    completed_resources = serializers.IntegerField()
+    total_resources = serializers.IntegerField(source='resource_count')
+    progress_percentage = serializers.SerializerMethodField()
+
+    def get_progress_percentage(self, obj):
+        return progress_percentage(obj.completed_resources, obj.resource_count)
+
+class ResourceEngagementSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = ResourceEngagement
+        fields = ['resource', 'title', 'learners', 'completions', 'completion_rate', 'average_seconds_to_complete',
+                  'quiz_attempts', 'quiz_pass_rate', 'quiz_average_score', 'computed_at']
+        read_only_fields = fields
+
+class LearningPathEngagementSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = LearningPathEngagement
+        fields = ['learning_path', 'title', 'learners', 'completions', 'completion_rate',
+                  'average_seconds_to_complete', 'computed_at']
+        read_only_fields = fields
+
+class QuizQuestionStatsSerializer(serializers.ModelSerializer):
+    order = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = QuizQuestionStats
+        fields = ['question', 'quiz', 'order', 'responses', 'correct_rate', 'discrimination', 'computed_at']
+        read_only_fields = fields
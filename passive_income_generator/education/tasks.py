@@ -0,0 +1,43 @@
+## education/tasks.py
+
+from celery import shared_task
+from .engagement import aggregate_education_engagement as aggregate_engagement
+from .learning_paths import rebuild_learning_path_progress as rebuild_path_progress
+from .ratings import reconcile_rating_aggregates as reconcile_ratings
+from .recommendations import rebuild_resource_neighbors as rebuild_neighbors
+from .view_counts import flush_view_counts as flush
+
+@shared_task
+def flush_view_counts():
+    """
+    Add buffered resource views to the stored view counts.
+    """
+    return flush()
+
+@shared_task
+def rebuild_resource_neighbors():
+    """
+    Recompute the item-item similarities behind resource recommendations.
+    """
+    return rebuild_neighbors()
+
+@shared_task
+def reconcile_rating_aggregates():
+    """
+    Repair resource rating counts and averages that drifted from the stored ratings.
+    """
+    return reconcile_ratings()
+
+@shared_task
+def rebuild_learning_path_progress(path_ids=None):
+    """
+    Recompute users' learning path progress, after path membership changes or nightly for all paths.
+    """
+    return rebuild_path_progress(path_ids)
+
+@shared_task
+def aggregate_education_engagement():
+    """
+    Rebuild the resource, learning path and quiz question engagement summaries.
+    """
+    return aggregate_engagement()
@@ -0,0 +1,213 @@
+## education/typeahead.py
+
+import heapq
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from income_streams.models import IncomeStream
+from .index_sync import ChangeLog, LiveIndex
+from .models import EducationResource, ResourceCategory
+
+RESOURCE = 'resource'
+CATEGORY = 'category'
+INCOME_STREAM = 'income_stream'
+KINDS = (RESOURCE, CATEGORY, INCOME_STREAM)
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+def normalize(text):
+    """
+    Lower-case, strip accents and collapse punctuation so 'Côte-d'Or' matches 'cote d or'.
+    """
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ' '.join(WORD_RE.findall(''.join(char for char in decomposed if not unicodedata.combining(char))))
+
+class PrefixIndex:
+    """
+    Sorted array of (key, kind, id) entries searched with bisect.
+
+    Every word start of a label is a key, so 'inc' and 'passive inc' both find
+    'Passive Income Basics'. Matches are ranked by weight (views for resources,
+    views of their resources for categories, investors for income streams).
+
+    Narrow prefixes rank their bisected range. Broad prefixes, whose range
+    would be slow to rank, instead walk each kind's items heaviest first and
+    stop after limit matches, which takes few steps precisely because so many
+    items match. Results for broad prefixes are memoised until the next change.
+    """
+    BROAD_RANGE = 1000
+    MEMO_SIZE = 512
+
+    def __init__(self):
+        self.entries = []
+        self.items = {}
+        self.ranked = {kind: [] for kind in KINDS}
+        self.version = None
+        self.built_at = time.monotonic()
+        self._memo = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def _keys(self, label):
+        words = normalize(label).split()
+        return tuple({' '.join(words[start:]) for start in range(len(words))})
+
+    def _rank(self, item_id, label, weight):
+        return (-weight, len(label), label, item_id)
+
+    def add(self, kind, item_id, label, weight):
+        self.remove(kind, item_id)
+        keys = self._keys(label)
+        for key in keys:
+            insort(self.entries, (key, kind, item_id))
+        insort(self.ranked[kind], self._rank(item_id, label, weight))
+        self.items[(kind, item_id)] = (label, weight, keys)
+        self._memo.clear()
+
+    def bulk_load(self, items):
+        """
+        Load (kind, id, label, weight) items into an empty index with a single sort.
+        """
+        for kind, item_id, label, weight in items:
+            keys = self._keys(label)
+            self.entries.extend((key, kind, item_id) for key in keys)
+            self.ranked[kind].append(self._rank(item_id, label, weight))
+            self.items[(kind, item_id)] = (label, weight, keys)
+        self.entries.sort()
+        for ranked in self.ranked.values():
+            ranked.sort()
+
+    def remove(self, kind, item_id):
+        item = self.items.pop((kind, item_id), None)
+        if item is None:
+            return
+        label, weight, keys = item
+        for entry in [(key, kind, item_id) for key in keys]:
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+        rank = self._rank(item_id, label, weight)
+        ranked = self.ranked[kind]
+        position = bisect_left(ranked, rank)
+        if position < len(ranked) and ranked[position] == rank:
+            del ranked[position]
+        self._memo.clear()
+
+    def _rank_range(self, start, end, limit, kinds):
+        matches = {(kind, item_id) for _, kind, item_id in self.entries[start:end] if kind in kinds}
+        return heapq.nsmallest(
+            limit, ((self._rank(item_id, *self.items[(kind, item_id)][:2]), kind) for kind, item_id in matches)
+        )
+
+    def _walk_ranked(self, prefix, limit, kinds):
+        best = []
+        for kind in kinds:
+            found = 0
+            for rank in self.ranked[kind]:
+                if any(key.startswith(prefix) for key in self.items[(kind, rank[3])][2]):
+                    best.append((rank, kind))
+                    found += 1
+                    if found == limit:
+                        break
+        return heapq.nsmallest(limit, best)
+
+    def complete(self, prefix, limit=10, kinds=KINDS):
+        """
+        Return up to limit (kind, id, label, weight) matches for prefix, heaviest first.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit, tuple(kinds))
+        memoised = self._memo.get(memo_key)
+        if memoised is not None:
+            self._memo.move_to_end(memo_key)
+            return memoised
+
+        start = bisect_left(self.entries, (prefix,))
+        end = bisect_left(self.entries, (prefix + '\uffff',), start)
+        span = end - start
+        # Ranking the range costs about span steps; walking by weight about
+        # limit * entries / span, since roughly one entry in entries / span matches.
+        if span * span > limit * len(self.entries):
+            best = self._walk_ranked(prefix, limit, kinds)
+        else:
+            best = self._rank_range(start, end, limit, kinds)
+        results = [(kind, rank[3], rank[2], -rank[0]) for rank, kind in best]
+
+        if span >= self.BROAD_RANGE:
+            self._memo[memo_key] = results
+            if len(self._memo) > self.MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return results
+
+def _resource_items(queryset):
+    return ((RESOURCE, resource_id, title, view_count)
+            for resource_id, title, view_count in queryset.values_list('id', 'title', 'view_count').iterator())
+
+def _category_items(queryset):
+    views = Sum('resources__view_count', filter=Q(resources__is_published=True))
+    return ((CATEGORY, category_id, name, weight or 0)
+            for category_id, name, weight in queryset.annotate(weight=views).values_list('id', 'name', 'weight'))
+
+def _income_stream_items(queryset):
+    investors = Count('user_investments__user', distinct=True)
+    return ((INCOME_STREAM, stream_id, name, weight)
+            for stream_id, name, weight in queryset.annotate(weight=investors).values_list('id', 'name', 'weight'))
+
+def _items(kind, item_ids=None):
+    if kind == RESOURCE:
+        queryset = EducationResource.objects.filter(is_published=True)
+        loader = _resource_items
+    elif kind == CATEGORY:
+        queryset = ResourceCategory.objects.all()
+        loader = _category_items
+    else:
+        queryset = IncomeStream.objects.all()
+        loader = _income_stream_items
+    if item_ids is not None:
+        queryset = queryset.filter(pk__in=item_ids)
+    return loader(queryset.order_by())
+
+TYPEAHEAD_VERSION_KEY = 'typeahead-version'
+
+def build_index():
+    index = PrefixIndex()
+    for kind in KINDS:
+        index.bulk_load(_items(kind))
+    return index
+
+def _load_changes(entries):
+    changed = {}
+    for kind, item_ids in entries:
+        changed.setdefault(kind, set()).update(item_ids)
+    return [(kind, item_ids, list(_items(kind, item_ids))) for kind, item_ids in changed.items()]
+
+def _apply_changes(index, loaded):
+    for kind, item_ids, items in loaded:
+        for item_id in item_ids:
+            index.remove(kind, item_id)
+        for item in items:
+            index.add(*item)
+
+# Also rebuilt in the background once older than TYPEAHEAD_MAX_AGE seconds, as weights drift with views.
+live_index = LiveIndex(
+    ChangeLog(TYPEAHEAD_VERSION_KEY), build_index, _load_changes, _apply_changes,
+    max_age=lambda: settings.TYPEAHEAD_MAX_AGE, name='typeahead index'
+)
+
+def items_changed(kind, item_ids):
+    """
+    Record, once the transaction commits, that items were saved or deleted.
+
+    This process re-reads them straight away; others replay the change in the background.
+    """
+    live_index.changed((kind, list(item_ids)))
+
+def complete(prefix, limit=10, kinds=KINDS):
+    return live_index.query(lambda index: index.complete(prefix, limit, kinds))
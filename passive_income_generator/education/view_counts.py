@@ -0,0 +1,192 @@
+## education/view_counts.py
+
+import atexit
+import logging
+import threading
+import uuid
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import F
+from .models import EducationResource
+
+logger = logging.getLogger(__name__)
+
+# A resource's dirty marker normally lives until the flush that picks it up; the
+# timeout only re-journals it if its journal entry was lost (e.g. evicted).
+DIRTY_MARKER_TIMEOUT = 60 * 60
+# Longest a flush may hold the lock without finishing a batch; each batch renews it.
+FLUSH_LOCK_TIMEOUT = 60 * 5
+
+def apply_view_counts(counts, applied=None):
+    """
+    Add pending views to the stored counters, one UPDATE per resource.
+
+    Rows are updated in id order and each statement commits on its own, so row
+    locks are held only for a single increment. applied(resource_id, count) is
+    called after each UPDATE, so callers can settle exactly what was written
+    when a later one fails.
+    """
+    for resource_id in sorted(counts):
+        EducationResource.objects.filter(pk=resource_id).update(view_count=F('view_count') + counts[resource_id])
+        if applied is not None:
+            applied(resource_id, counts[resource_id])
+    return sum(counts.values())
+
+class InMemoryViewCounter:
+    """
+    Per-process view counts flushed by a background thread every VIEW_COUNT_FLUSH_INTERVAL seconds.
+
+    Counts that fail to be written are put back for the next flush; counts
+    still buffered when the process dies are lost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._thread = None
+
+    def add(self, resource_id):
+        with self._lock:
+            self._counts[resource_id] += 1
+            self._ensure_flusher()
+
+    def flush(self):
+        with self._lock:
+            counts = self._counts
+            self._counts = Counter()
+        if not counts:
+            return 0
+        pending = dict(counts)
+        try:
+            return apply_view_counts(counts, applied=lambda resource_id, _: pending.pop(resource_id))
+        except Exception:
+            with self._lock:
+                self._counts.update(pending)
+            raise
+
+    def _ensure_flusher(self):
+        # Also restarts the thread in a forked worker, where it does not survive the fork.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='view-count-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(settings.VIEW_COUNT_FLUSH_INTERVAL):
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered view counts")
+
+class CacheViewCounter:
+    """
+    View counts kept in the shared Django cache and drained by the flush_view_counts task.
+
+    The first view of a resource since the last flush sets a dirty marker and
+    appends the id to a journal of numbered slots, so a flush reads only the
+    resources viewed since the previous one. Each count is written to the
+    database before exactly that much is subtracted from the cache, so views
+    counted during a flush are kept and a failed write is retried; the journal
+    position only advances once a batch is fully written. Flushes hold a lock
+    in the cache, so an overlapping flush (a slow one running into the next
+    beat tick, or a manual one) returns instead of writing the same counts.
+    """
+    JOURNAL_KEY = 'resource-views:journal'
+    FLUSHED_KEY = 'resource-views:journal-flushed'
+    LOCK_KEY = 'resource-views:flush-lock'
+
+    def _key(self, resource_id):
+        return f'resource-views:{resource_id}'
+
+    def _dirty_key(self, resource_id):
+        return f'resource-views:dirty:{resource_id}'
+
+    def _slot_key(self, slot):
+        return f'resource-views:journal:{slot}'
+
+    def _incr(self, key, timeout=None):
+        cache.add(key, 0, timeout=timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr().
+            cache.set(key, 1, timeout=timeout)
+            return 1
+
+    def add(self, resource_id):
+        self._incr(self._key(resource_id))
+        if cache.add(self._dirty_key(resource_id), 1, timeout=DIRTY_MARKER_TIMEOUT):
+            slot = self._incr(self.JOURNAL_KEY)
+            cache.set(self._slot_key(slot), resource_id, timeout=None)
+
+    def _settle(self, resource_id, count):
+        try:
+            cache.decr(self._key(resource_id), count)
+        except ValueError:
+            pass
+
+    def flush(self, batch_size=1000):
+        token = uuid.uuid4().hex
+        if not cache.add(self.LOCK_KEY, token, timeout=FLUSH_LOCK_TIMEOUT):
+            return 0
+        try:
+            return self._flush_journal(token, batch_size)
+        finally:
+            if cache.get(self.LOCK_KEY) == token:
+                cache.delete(self.LOCK_KEY)
+
+    def _flush_journal(self, token, batch_size):
+        applied = 0
+        while True:
+            if cache.get(self.LOCK_KEY) != token:
+                # The lock expired and another flush may hold it now.
+                logger.warning("View count flush lost its lock; stopping early")
+                return applied
+            cache.touch(self.LOCK_KEY, FLUSH_LOCK_TIMEOUT)
+            journal = cache.get(self.JOURNAL_KEY, 0)
+            flushed = cache.get(self.FLUSHED_KEY, 0)
+            if journal < flushed:
+                # The journal counter was evicted and restarted.
+                flushed = 0
+            last = min(journal, flushed + batch_size)
+            if last <= flushed:
+                return applied
+            slots = [self._slot_key(slot) for slot in range(flushed + 1, last + 1)]
+            resource_ids = set(cache.get_many(slots).values())
+            # Views from here on mark and journal their resource again for the next flush.
+            cache.delete_many([self._dirty_key(resource_id) for resource_id in resource_ids])
+            pending = cache.get_many([self._key(resource_id) for resource_id in resource_ids])
+            counts = {
+                resource_id: pending[self._key(resource_id)]
+                for resource_id in resource_ids if pending.get(self._key(resource_id))
+            }
+            applied += apply_view_counts(counts, applied=self._settle)
+            cache.set(self.FLUSHED_KEY, last, timeout=None)
+            cache.delete_many(slots)
+
+_counter = None
+_counter_lock = threading.Lock()
+
+def get_counter():
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                if settings.VIEW_COUNT_BACKEND == 'cache':
+                    _counter = CacheViewCounter()
+                else:
+                    _counter = InMemoryViewCounter()
+                    atexit.register(_counter.flush)
+    return _counter
+
+def record_view(resource_id):
+    """
+    Count a resource view without writing to the database on the request path.
+    """
+    get_counter().add(resource_id)
+
+def flush_view_counts():
+    return get_counter().flush()
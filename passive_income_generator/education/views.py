@@ -3,13 +3,15 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg, Q
+from django.conf import settings
+from django.db.models import F
 from django.utils import timezone
 from .models import (
     EducationResource, ResourceCategory, UserProgress, ResourceRating,
-    LearningPath, LearningPathItem, Quiz, QuizQuestion, QuizAnswer,
-    UserQuizAttempt, UserQuizAnswer
+    LearningPath, LearningPathItem, Quiz, ResourceEngagement, LearningPathEngagement, QuizQuestionStats
 )
 from .serializers import (
     EducationResourceSerializer, ResourceCategorySerializer, UserProgressSerializer,
@@ -17,28 +19,72 @@ from .serializers import (
     UserQuizAttemptSerializer, EducationResourceDetailSerializer,
     UserEducationProgressSerializer, LearningPathDetailSerializer,
     QuizSubmissionSerializer, ResourceRecommendationSerializer,
-    UserLearningPathProgressSerializer
+    UserLearningPathProgressSerializer, EducationResourceSearchResultSerializer,
+    LearningPathProgressSerializer, EducationResourceSummarySerializer, ResourceEngagementSerializer,
+    LearningPathEngagementSerializer, QuizQuestionStatsSerializer
 )
+from .content import get_body, summaries
+from .learning_paths import (
+    get_learning_path_document, learning_paths_with_items, learning_paths_with_progress, progress_percentage
+)
+from .quiz_grading import submit_quiz
+from .recommendations import recommend_resources
+from .search import search_resources
+from .typeahead import KINDS, complete
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class EducationResourceListCreateView(generics.ListCreateAPIView):
+    """
+    ?ordering=rating lists the best rated resources first, straight from the rating index.
+    """
     queryset = EducationResource.objects.all()
     serializer_class = EducationResourceSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return EducationResourceSummarySerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = summaries(super().get_queryset())
+        if self.request.query_params.get('ordering') == 'rating':
+            queryset = queryset.order_by('-average_rating', '-rating_count')
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 class EducationResourceRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = EducationResource.objects.all()
+    """
+    The body is not selected with the resource; reads take it from the body cache (education.content).
+    """
+    queryset = EducationResource.objects.defer('content')
     serializer_class = EducationResourceDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_serializer_context(self):
+        """
+        Select the embedded ratings page from ?ratings_offset= and ?ratings_limit=.
+        """
+        context = super().get_serializer_context()
+        params = self.request.query_params
+        try:
+            context['ratings_offset'] = max(int(params.get('ratings_offset', 0)), 0)
+            context['ratings_limit'] = min(
+                max(int(params.get('ratings_limit', settings.RESOURCE_RATINGS_PAGE_SIZE)), 1),
+                settings.RESOURCE_RATINGS_MAX_PAGE_SIZE
+            )
+        except ValueError:
+            raise ValidationError({'ratings_offset': 'ratings_offset and ratings_limit must be integers.'})
+        return context
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         instance.increment_view_count()
+        instance.content = get_body(instance)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -71,7 +117,7 @@ class ResourceRatingListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user, resource=resource)
 
 class LearningPathListCreateView(generics.ListCreateAPIView):
-    queryset = LearningPath.objects.all()
+    queryset = LearningPath.objects.prefetch_related('learningpathitem_set')
     serializer_class = LearningPathSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -79,10 +125,22 @@ class LearningPathListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 class LearningPathRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = LearningPath.objects.all()
+    """
+    Reads are served from the cached path document; see education.learning_paths.
+    """
+    queryset = learning_paths_with_items()
     serializer_class = LearningPathDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def retrieve(self, request, *args, **kwargs):
+        document = get_learning_path_document(
+            kwargs[self.lookup_url_kwarg or self.lookup_field],
+            lambda path: self.get_serializer(path).data
+        )
+        if document is None:
+            raise Http404
+        return Response(document)
+
 class QuizRetrieveView(generics.RetrieveAPIView):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
@@ -95,21 +153,16 @@ class QuizSubmissionView(APIView):
         serializer = QuizSubmissionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        quiz = serializer.validated_data['quiz_id']
-        answers = serializer.validated_data['answers']
-
-        quiz_attempt = UserQuizAttempt.objects.create(user=request.user, quiz=quiz)
-
-        for answer in answers:
-            question = get_object_or_404(QuizQuestion, id=answer['question_id'], quiz=quiz)
-            selected_answer = get_object_or_404(QuizAnswer, id=answer['answer_id'], question=question)
-            UserQuizAnswer.objects.create(attempt=quiz_attempt, question=question, answer=selected_answer)
-
-        quiz_attempt.calculate_score()
+        attempt = submit_quiz(
+            request.user,
+            serializer.validated_data['quiz_id'],
+            serializer.validated_data['answer_key'],
+            serializer.validated_data['answers']
+        )
 
         return Response({
-            'score': quiz_attempt.score,
-            'passed': quiz_attempt.passed
+            'score': attempt.score,
+            'passed': attempt.passed
         }, status=status.HTTP_201_CREATED)
 
 class UserEducationProgressView(generics.RetrieveAPIView):
@@ -129,23 +182,14 @@ class MarkResourceCompletedView(APIView):
         return Response({'status': 'Resource marked as completed'}, status=status.HTTP_200_OK)
 
 class ResourceRecommendationView(APIView):
+    """
+    Published resources the user has not completed, ranked from precomputed item-item similarities.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        completed_resources = UserProgress.objects.filter(user=user, completed=True).values_list('resource', flat=True)
-        
-        # Get resources not completed by the user
-        recommendations = EducationResource.objects.exclude(id__in=completed_resources)
-        
-        # Apply some recommendation logic (e.g., based on user's interests, difficulty level, etc.)
-        recommendations = recommendations.annotate(
-            avg_rating=Avg('ratings__rating'),
-            relevance_score=Count('ratings') + Count('categories')
-        ).order_by('-relevance_score', '-avg_rating')[:5]
-
         serializer = ResourceRecommendationSerializer(
-            [{'resource': r, 'relevance_score': r.relevance_score} for r in recommendations],
+            [{'resource': resource, 'relevance_score': score} for resource, score in recommend_resources(request.user)],
             many=True
         )
         return Response(serializer.data)
@@ -154,72 +198,127 @@ class UserLearningPathProgressView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, learning_path_id):
-        learning_path = get_object_or_404(LearningPath, id=learning_path_id)
-        user = request.user
-
-        total_resources = learning_path.resources.count()
-        completed_resources = UserProgress.objects.filter(
-            user=user,
-            resource__in=learning_path.resources.all(),
-            completed=True
-        ).count()
-
-        progress_percentage = (completed_resources / total_resources) * 100 if total_resources > 0 else 0
-
+        learning_path = get_object_or_404(
+            learning_paths_with_progress(request.user).prefetch_related('learningpathitem_set'),
+            id=learning_path_id
+        )
         data = {
             'learning_path': learning_path,
-            'completed_resources': completed_resources,
-            'total_resources': total_resources,
-            'progress_percentage': progress_percentage
+            'completed_resources': learning_path.completed_resources,
+            'total_resources': learning_path.resource_count,
+            'progress_percentage': progress_percentage(learning_path.completed_resources, learning_path.resource_count)
         }
 
         serializer = UserLearningPathProgressSerializer(data)
         return Response(serializer.data)
 
+class UserLearningPathsProgressView(generics.ListAPIView):
+    """
+    The user's progress on every learning path, from the incrementally maintained counters in one query.
+    """
+    serializer_class = LearningPathProgressSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            learning_paths_with_progress(self.request.user)
+            .only('id', 'title', 'resource_count')
+            .order_by('id')
+        )
+
 class SearchEducationResourcesView(generics.ListAPIView):
-    serializer_class = EducationResourceSerializer
+    """
+    Ranked full-text search: ?q=<text> with optional resource_type, difficulty_level and category (id or name).
+    """
+    serializer_class = EducationResourceSearchResultSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
-        return EducationResource.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(categories__name__icontains=query)
-        ).distinct()
+        params = self.request.query_params
+        query = params.get('q', '').strip()
+        if not query:
+            return []
+
+        difficulty_level = params.get('difficulty_level')
+        if difficulty_level is not None:
+            try:
+                difficulty_level = int(difficulty_level)
+            except ValueError:
+                raise ValidationError({'difficulty_level': 'Must be an integer between 1 and 5.'})
+
+        category_id = params.get('category')
+        if category_id is not None and not category_id.isdigit():
+            category_id = ResourceCategory.objects.filter(name__iexact=category_id).values_list('id', flat=True).first()
+            if category_id is None:
+                return []
+
+        return search_resources(
+            query,
+            resource_type=params.get('resource_type'),
+            difficulty_level=difficulty_level,
+            category_id=int(category_id) if category_id is not None else None,
+        )
+
+class TypeaheadView(APIView):
+    """
+    Title suggestions as you type: ?q=<prefix> with optional types (comma-separated) and limit.
+
+    Served from an in-process prefix index kept current in the background, so
+    no query runs on the request path once the process has built it.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_QUERY_LENGTH = 100
+
+    def get(self, request):
+        params = request.query_params
+        query = params.get('q', '')[:self.MAX_QUERY_LENGTH]
+
+        kinds = KINDS
+        if params.get('types'):
+            kinds = tuple(kind for kind in params['types'].split(',') if kind in KINDS)
+            if not kinds:
+                raise ValidationError({'types': f"Must be a comma-separated list of: {', '.join(KINDS)}."})
+
+        try:
+            limit = min(max(int(params.get('limit', 10)), 1), settings.TYPEAHEAD_MAX_RESULTS)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+
+        results = [
+            {'type': kind, 'id': item_id, 'label': label, 'weight': weight}
+            for kind, item_id, label, weight in complete(query, limit, kinds)
+        ]
+        return Response({'query': query, 'results': results})
 
 class PopularResourcesView(generics.ListAPIView):
-    serializer_class = EducationResourceSerializer
+    serializer_class = EducationResourceSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return EducationResource.objects.annotate(
-            avg_rating=Avg('ratings__rating'),
-            num_ratings=Count('ratings')
-        ).order_by('-view_count', '-avg_rating', '-num_ratings')[:10]
+        return summaries().order_by('-view_count', '-average_rating', '-rating_count')[:10]
 
 class RecentlyAddedResourcesView(generics.ListAPIView):
-    serializer_class = EducationResourceSerializer
+    serializer_class = EducationResourceSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
-    queryset = EducationResource.objects.filter(is_published=True).order_by('-publication_date')[:10]
+    queryset = summaries().filter(is_published=True).order_by('-publication_date')[:10]
 
 class UserCompletedResourcesView(generics.ListAPIView):
-    serializer_class = EducationResourceSerializer
+    serializer_class = EducationResourceSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return EducationResource.objects.filter(
+        return summaries().filter(
             userprogress__user=self.request.user,
             userprogress__completed=True
         )
 
 class ResourcesByCategoryView(generics.ListAPIView):
-    serializer_class = EducationResourceSerializer
+    serializer_class = EducationResourceSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         category_id = self.kwargs.get('category_id')
-        return EducationResource.objects.filter(categories__id=category_id)
+        return summaries().filter(categories__id=category_id)
 
 class StartLearningPathView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -231,3 +330,39 @@ class StartLearningPathView(APIView):
             UserProgress.objects.get_or_create(user=request.user, resource=first_resource)
             return Response({'status': 'Started learning path', 'first_resource_id': first_resource.id}, status=status.HTTP_200_OK)
         return Response({'error': 'No resources in this learning path'}, status=status.HTTP_400_BAD_REQUEST)
+
+class ResourceEngagementListView(generics.ListAPIView):
+    """
+    Nightly per-resource engagement summaries for content dashboards (see education.engagement).
+    """
+    serializer_class = ResourceEngagementSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = ResourceEngagement.objects.annotate(title=F('resource__title')).order_by('-learners', 'resource_id')
+
+class ResourceEngagementRetrieveView(generics.RetrieveAPIView):
+    serializer_class = ResourceEngagementSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = ResourceEngagementListView.queryset
+    lookup_field = 'resource_id'
+
+class LearningPathEngagementListView(generics.ListAPIView):
+    """
+    Nightly per-learning-path engagement summaries for content dashboards.
+    """
+    serializer_class = LearningPathEngagementSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = LearningPathEngagement.objects.annotate(title=F('learning_path__title')).order_by('-learners', 'learning_path_id')
+
+class QuizQuestionStatsListView(generics.ListAPIView):
+    """
+    Nightly difficulty statistics for each question of a quiz, in question order.
+    """
+    serializer_class = QuizQuestionStatsSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        return (
+            QuizQuestionStats.objects.filter(quiz_id=self.kwargs.get('quiz_id'))
+            .annotate(order=F('question__order'))
+            .order_by('order', 'question_id')
+        )
@@ -0,0 +1,136 @@
+## income_streams/ledger.py
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from accounts.models import Profile
+from accounts.user_context import invalidate_user_contexts
+from analytics.models import Analytics
+from .models import Earnings, UserIncomeStream
+
+CENT = Decimal('0.01')
+SECONDS_PER_YEAR = Decimal(365 * 24 * 60 * 60)
+
+def record_earnings(entries):
+    """
+    Record a batch of (user_income_stream, amount) earnings in one transaction.
+
+    Earnings are bulk inserted, each stream's last_earning_update (already
+    moved to the time its amount pays up to) is saved, and each user's
+    profile total is incremented once with the amounts folded per user,
+    instead of once per earning.
+    """
+    if not entries:
+        return 0
+    per_user = defaultdict(Decimal)
+    for user_income_stream, amount in entries:
+        per_user[user_income_stream.user_id] += amount
+
+    with transaction.atomic():
+        Earnings.objects.bulk_create([
+            Earnings(user_income_stream=user_income_stream, amount=amount)
+            for user_income_stream, amount in entries
+        ])
+        UserIncomeStream.objects.bulk_update(
+            [user_income_stream for user_income_stream, _ in entries], ['last_earning_update']
+        )
+        Profile.add_earnings(per_user)
+        Analytics.bump_data_version(user_id__in=list(per_user))
+    return len(entries)
+
+def accrued_amount(user_income_stream, now):
+    """
+    Return (amount, paid_until) for earnings accrued since the last update at the stream's expected annual return.
+
+    The amount is rounded down to the cent, and paid_until is the time that
+    amount pays up to rather than now, so the fraction of a cent cut off is
+    carried into the next accrual instead of being lost.
+    """
+    since = user_income_stream.last_earning_update or user_income_stream.investment_date
+    seconds = Decimal((now - since).total_seconds())
+    yearly = user_income_stream.invested_amount * user_income_stream.income_stream.expected_return / 100
+    if seconds <= 0 or yearly <= 0:
+        return Decimal('0'), since
+    amount = (yearly * seconds / SECONDS_PER_YEAR).quantize(CENT, rounding=ROUND_DOWN)
+    # Truncated to the microsecond, so the clock never moves past the time the amount pays for.
+    covered = int(amount * SECONDS_PER_YEAR / yearly * 1000000)
+    return amount, since + timedelta(microseconds=covered)
+
+def accrue_earnings(now=None, batch_size=None):
+    """
+    Accrue earnings for every funded position, a primary-key batch at a time.
+
+    Positions whose accrual is still under a cent keep their last update time,
+    so the amount keeps growing until it can be paid out.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.EARNINGS_ACCRUAL_BATCH_SIZE
+    recorded = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            positions = list(
+                UserIncomeStream.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(pk__gt=last_pk, invested_amount__gt=0)
+                .select_related('income_stream')
+                .only('id', 'user_id', 'invested_amount', 'investment_date', 'last_earning_update',
+                      'income_stream__id', 'income_stream__expected_return')
+                .order_by('pk')[:batch_size]
+            )
+            if not positions:
+                return recorded
+            last_pk = positions[-1].pk
+
+            entries = []
+            for position in positions:
+                amount, paid_until = accrued_amount(position, now)
+                if amount > 0:
+                    position.last_earning_update = paid_until
+                    entries.append((position, amount))
+            recorded += record_earnings(entries)
+
+def reconcile_profile_earnings(batch_size=None):
+    """
+    Repair profile totals that drifted from the sum of their earnings.
+
+    Each batch locks its profiles before summing, so an increment racing with
+    the repair waits and is applied on top of the corrected value. Returns the
+    number of profiles repaired.
+    """
+    batch_size = batch_size or settings.EARNINGS_RECONCILE_BATCH_SIZE
+    repaired = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            profiles = list(
+                Profile.objects.select_for_update(of=('self',))
+                # Archived accounts keep their total while their earnings sit in cold storage.
+                .filter(pk__gt=last_pk, user__account_archive__isnull=True)
+                .only('id', 'user_id', 'total_earnings')
+                .order_by('pk')[:batch_size]
+            )
+            if not profiles:
+                return repaired
+            last_pk = profiles[-1].pk
+
+            totals = dict(
+                Earnings.objects
+                .filter(user_income_stream__user_id__in=[profile.user_id for profile in profiles])
+                .values('user_income_stream__user_id')
+                .annotate(total=Sum('amount'))
+                .values_list('user_income_stream__user_id', 'total')
+            )
+            drifted = []
+            for profile in profiles:
+                expected = totals.get(profile.user_id) or Decimal('0')
+                if profile.total_earnings != expected:
+                    profile.total_earnings = expected
+                    drifted.append(profile)
+            if drifted:
+                Profile.objects.bulk_update(drifted, ['total_earnings'])
+                invalidate_user_contexts([profile.user_id for profile in drifted])
+            repaired += len(drifted)
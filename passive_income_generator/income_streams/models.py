@@ -1,8 +1,11 @@
 ## income_streams/models.py
 
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from accounts.models import Profile
 
 class IncomeStream(models.Model):
     """
@@ -142,3 +145,25 @@ class WithdrawalRequest(models.Model):
             self.save()
             return True
         return False
+
+def _earning_owner_id(earning):
+    if Earnings.user_income_stream.is_cached(earning):
+        return earning.user_income_stream.user_id
+    return UserIncomeStream.objects.filter(pk=earning.user_income_stream_id).values_list('user_id', flat=True).first()
+
+@receiver(post_save, sender=Earnings)
+def add_earning_to_profile_total(sender, instance, created, raw=False, **kwargs):
+    # Edits to an existing amount are left to the periodic reconciliation.
+    if created and not raw:
+        Profile.add_earnings({_earning_owner_id(instance): instance.amount})
+
+@receiver(post_delete, sender=Earnings)
+def remove_earning_from_profile_total(sender, instance, **kwargs):
+    user_id = _earning_owner_id(instance)
+    if user_id is not None:
+        Profile.add_earnings({user_id: -instance.amount})
+
+@receiver([post_save, post_delete], sender=IncomeStream)
+def refresh_income_stream_typeahead(sender, instance, **kwargs):
+    from education.typeahead import INCOME_STREAM, items_changed
+    items_changed(INCOME_STREAM, [instance.pk])
@@ -0,0 +1,18 @@
+## income_streams/tasks.py
+
+from celery import shared_task
+from .ledger import accrue_earnings, reconcile_profile_earnings as reconcile
+
+@shared_task
+def update_earnings():
+    """
+    Hourly accrual: record earnings for funded positions and fold them into profile totals.
+    """
+    return accrue_earnings()
+
+@shared_task
+def reconcile_profile_earnings():
+    """
+    Repair profile earnings totals that drifted from the earnings ledger.
+    """
+    return reconcile()
@@ -0,0 +1,98 @@
+## notifications/digests.py
+
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from accounts.models import UserPreferences
+from analytics.models import Analytics
+from income_streams.models import Earnings
+from .mail import queue_emails
+
+def _earnings_since_last_digest(user_ids, first_digest_since):
+    """
+    Sum each user's earnings since their previous digest with one grouped query.
+    """
+    since = Coalesce(
+        F('user_income_stream__user__preferences__last_digest_at'),
+        Value(first_digest_since, output_field=DateTimeField())
+    )
+    rows = (
+        Earnings.objects
+        .filter(user_income_stream__user_id__in=user_ids)
+        .annotate(since=since)
+        .filter(earning_date__gt=F('since'))
+        .values('user_income_stream__user_id')
+        .annotate(total=Sum('amount'))
+        .values_list('user_income_stream__user_id', 'total')
+    )
+    return dict(rows)
+
+def _digest_body(username, currency, earned, roi, previous_roi, frequency):
+    period = 'day' if frequency == 1 else f'{frequency} days'
+    lines = [
+        f"Hi {username},",
+        "",
+        f"Here is your earnings summary for the last {period}.",
+        f"Earnings: {earned:.2f} {currency}",
+        f"Overall ROI: {roi:.2f}%",
+    ]
+    if previous_roi is not None:
+        lines.append(f"ROI change since your last digest: {roi - previous_roi:+.2f} percentage points")
+    return '\n'.join(lines)
+
+def send_due_digests_batch(now, batch_size):
+    """
+    Compose and queue digests for one batch of due active users; returns (processed, queued).
+    """
+    with transaction.atomic():
+        due = list(
+            UserPreferences.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(receive_notifications=True, next_digest_at__lte=now, user__is_active=True)
+            .order_by('next_digest_at')
+            .select_related('user')
+            .only('id', 'notification_frequency', 'preferred_currency', 'last_digest_roi',
+                  'user__id', 'user__username', 'user__email')[:batch_size]
+        )
+        if not due:
+            return 0, 0
+
+        user_ids = [preferences.user_id for preferences in due]
+        earned = _earnings_since_last_digest(user_ids, now - timedelta(days=7))
+        rois = dict(Analytics.objects.filter(user_id__in=user_ids).values_list('user_id', 'overall_roi'))
+
+        messages = []
+        for preferences in due:
+            amount = earned.get(preferences.user_id) or Decimal('0')
+            roi = rois.get(preferences.user_id, Decimal('0'))
+            if amount > 0 or roi != preferences.last_digest_roi:
+                messages.append((
+                    'Your earnings digest',
+                    _digest_body(preferences.user.username, preferences.preferred_currency, amount, roi,
+                                 preferences.last_digest_roi, preferences.notification_frequency),
+                    [preferences.user.email],
+                ))
+            preferences.last_digest_at = now
+            preferences.last_digest_roi = roi
+            preferences.next_digest_at = now + timedelta(days=preferences.notification_frequency)
+
+        queued = queue_emails(messages)
+        UserPreferences.objects.bulk_update(due, ['last_digest_at', 'last_digest_roi', 'next_digest_at'])
+    return len(due), queued
+
+def send_due_digests(batch_size=None):
+    """
+    Queue earnings digests for every user whose next digest is due.
+    """
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    now = timezone.now()
+    totals = {'processed': 0, 'queued': 0}
+    while True:
+        processed, queued = send_due_digests_batch(now, batch_size)
+        if not processed:
+            return totals
+        totals['processed'] += processed
+        totals['queued'] += queued
@@ -0,0 +1,122 @@
+## notifications/mail.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import OutboundEmail
+
+def _schedule_drain():
+    from .tasks import drain_outbox
+    transaction.on_commit(lambda: drain_outbox.delay())
+
+def queue_email(subject, body, to, from_email=None):
+    """
+    Put one email in the outbox; a Celery worker sends it after the transaction commits.
+    """
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        next_attempt_at=timezone.now(),
+    )
+    _schedule_drain()
+    return email
+
+def queue_emails(messages):
+    """
+    Bulk-insert (subject, body, to) messages into the outbox and schedule one drain.
+    """
+    now = timezone.now()
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=list(to), next_attempt_at=now)
+        for subject, body, to in messages
+    ], batch_size=settings.MAIL_OUTBOX_BATCH_SIZE)
+    if emails:
+        _schedule_drain()
+    return len(emails)
+
+def claim_batch(batch_size=None):
+    """
+    Lock and mark a batch of due emails as sending, skipping rows other workers hold.
+
+    Rows stuck in 'sending' past MAIL_OUTBOX_CLAIM_TIMEOUT (a worker died) are reclaimed.
+    """
+    batch_size = batch_size or settings.MAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.MAIL_OUTBOX_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', claimed_at__lt=stale))
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if emails:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(status='sending', claimed_at=now)
+    return emails
+
+def _backoff(attempts):
+    return timedelta(seconds=settings.MAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+def send_batch(emails):
+    """
+    Send a claimed batch over a single SMTP connection and record each outcome.
+
+    Returns (sent, failed) counts; failed messages are rescheduled with
+    exponential backoff until MAIL_MAX_ATTEMPTS is reached.
+    """
+    now = timezone.now()
+    connection = get_connection()
+    open_error = None
+    try:
+        connection.open()
+    except Exception as exc:
+        open_error = exc
+
+    sent = 0
+    for email in emails:
+        error = open_error
+        if error is None:
+            try:
+                EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection).send()
+            except Exception as exc:
+                error = exc
+
+        if error is None:
+            email.status = 'sent'
+            email.sent_at = now
+            email.last_error = ''
+            sent += 1
+        else:
+            email.attempts += 1
+            email.last_error = str(error)
+            if email.attempts >= settings.MAIL_MAX_ATTEMPTS:
+                email.status = 'failed'
+            else:
+                email.status = 'pending'
+                email.next_attempt_at = now + _backoff(email.attempts)
+
+    if open_error is None:
+        connection.close()
+
+    OutboundEmail.objects.bulk_update(emails, ['status', 'sent_at', 'attempts', 'last_error', 'next_attempt_at'])
+    return sent, len(emails) - sent
+
+def drain(max_batches=None):
+    """
+    Send due outbox emails batch by batch until none are left (or max_batches is reached).
+    """
+    totals = {'sent': 0, 'failed': 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch()
+        if not emails:
+            break
+        sent, failed = send_batch(emails)
+        totals['sent'] += sent
+        totals['failed'] += failed
+        batches += 1
+    return totals
@@ -0,0 +1,19 @@
+## notifications/tasks.py
+
+from celery import shared_task
+from .mail import drain
+from .digests import send_due_digests
+
+@shared_task
+def drain_outbox():
+    """
+    Send due outbox emails; also runs on a schedule to pick up retries.
+    """
+    return drain(max_batches=50)
+
+@shared_task
+def send_digests():
+    """
+    Queue earnings digests for users whose notification_frequency says one is due.
+    """
+    return send_due_digests()
@@ -30,10 +30,58 @@ app.conf.beat_schedule = {
         'task': 'income_streams.tasks.update_earnings',
         'schedule': 3600.0,  # Run every hour (3600 seconds)
     },
+    'reconcile_profile_earnings_daily': {
+        'task': 'income_streams.tasks.reconcile_profile_earnings',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
     'generate_analytics_daily': {
         'task': 'analytics.tasks.generate_daily_analytics',
         'schedule': 86400.0,  # Run daily (86400 seconds)
     },
+    'enforce_activity_retention_daily': {
+        'task': 'accounts.tasks.enforce_activity_retention',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
+    'archive_deactivated_accounts_daily': {
+        'task': 'accounts.tasks.archive_deactivated_accounts',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
+    'flush_view_counts': {
+        'task': 'education.tasks.flush_view_counts',
+        'schedule': 60.0,  # Run every minute
+    },
+    'rebuild_resource_neighbors_daily': {
+        'task': 'education.tasks.rebuild_resource_neighbors',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
+    'reconcile_rating_aggregates_daily': {
+        'task': 'education.tasks.reconcile_rating_aggregates',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
+    'rebuild_learning_path_progress_daily': {
+        'task': 'education.tasks.rebuild_learning_path_progress',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
+    'aggregate_education_engagement_daily': {
+        'task': 'education.tasks.aggregate_education_engagement',
+        'schedule': 86400.0,  # Run daily (86400 seconds)
+    },
+    'drain_mail_outbox': {
+        'task': 'notifications.tasks.drain_outbox',
+        'schedule': 60.0,  # Run every minute to pick up retries
+    },
+    'send_digests_hourly': {
+        'task': 'notifications.tasks.send_digests',
+        'schedule': 3600.0,  # Run every hour (3600 seconds)
+    },
+    'export_analytics_warehouse_hourly': {
+        'task': 'analytics.tasks.export_analytics_warehouse',
+        'schedule': 3600.0,  # Run every hour (3600 seconds)
+    },
+    'fail_stalled_provisioning_jobs': {
+        'task': 'accounts.tasks.fail_stalled_provisioning_jobs',
+        'schedule': 900.0,  # Run every 15 minutes
+    },
 }
 
 # Optional: Configure Celery to use Redis as the result backend
@@ -49,6 +97,7 @@ app.conf.task_default_queue = 'default'
 app.conf.task_routes = {
     'income_streams.tasks.*': {'queue': 'income_streams'},
     'analytics.tasks.*': {'queue': 'analytics'},
+    'notifications.tasks.*': {'queue': 'notifications'},
 }
 
 # Optional: Set task serializer to JSON
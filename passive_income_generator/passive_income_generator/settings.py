@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'income_streams',
     'analytics',
     'education',
+    'notifications',
 ]
 
 MIDDLEWARE = [
@@ -139,7 +140,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -175,22 +176,151 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+# Cache settings
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Activity logging settings
+# 'buffered': in-process buffer flushed in bulk by a background thread (bounded loss)
+# 'durable': each event is published to Celery and written by a worker
+# 'sync': written inline on the request path
+ACTIVITY_LOG_MODE = os.environ.get('ACTIVITY_LOG_MODE', 'buffered')
+ACTIVITY_BUFFER_FLUSH_SIZE = int(os.environ.get('ACTIVITY_BUFFER_FLUSH_SIZE', 500))
+ACTIVITY_BUFFER_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_BUFFER_FLUSH_INTERVAL', 5))  # seconds
+ACTIVITY_BUFFER_MAX_SIZE = int(os.environ.get('ACTIVITY_BUFFER_MAX_SIZE', 10000))
+
+# Login throttling settings ('memory' keeps counters per process, 'cache' shares them via CACHES)
+LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory')
+LOGIN_THROTTLE_MAX_KEYS = int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', 100000))
+LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 30))
+LOGIN_THROTTLE_IP_WINDOW = int(os.environ.get('LOGIN_THROTTLE_IP_WINDOW', 60))  # seconds
+LOGIN_THROTTLE_USERNAME_LIMIT = int(os.environ.get('LOGIN_THROTTLE_USERNAME_LIMIT', 5))
+LOGIN_THROTTLE_USERNAME_WINDOW = int(os.environ.get('LOGIN_THROTTLE_USERNAME_WINDOW', 300))  # seconds
+
+# Bulk user provisioning settings
+PROVISIONING_CHUNK_SIZE = int(os.environ.get('PROVISIONING_CHUNK_SIZE', 1000))
+PROVISIONING_HASH_PROCESSES = int(os.environ.get('PROVISIONING_HASH_PROCESSES', 0))  # 0 = one per CPU
+PROVISIONING_MAX_ROWS_PER_REQUEST = int(os.environ.get('PROVISIONING_MAX_ROWS_PER_REQUEST', 50000))
+# Jobs unfinished after this long are failed and their encrypted task payloads expire;
+# keep it above the broker's redelivery (visibility) timeout.
+PROVISIONING_JOB_TIMEOUT = int(os.environ.get('PROVISIONING_JOB_TIMEOUT', 60 * 60 * 6))  # seconds
+
+# Activity log retention settings
+USER_ACTIVITY_RETENTION_DAYS = int(os.environ.get('USER_ACTIVITY_RETENTION_DAYS', 365))
+LOGIN_ATTEMPT_RETENTION_DAYS = int(os.environ.get('LOGIN_ATTEMPT_RETENTION_DAYS', 90))
+ACTIVITY_PARTITION_MONTHS_AHEAD = int(os.environ.get('ACTIVITY_PARTITION_MONTHS_AHEAD', 2))
+ACTIVITY_PARTITION_ARCHIVE = os.environ.get('ACTIVITY_PARTITION_ARCHIVE', 'False') == 'True'
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 5000))
+
+# Education view counting ('memory' buffers per process, 'cache' shares counters via CACHES)
+VIEW_COUNT_BACKEND = os.environ.get('VIEW_COUNT_BACKEND', 'memory')
+VIEW_COUNT_FLUSH_INTERVAL = float(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 10))  # seconds
+
+# Education search settings
+# 'auto' uses the PostgreSQL tsvector index once installed (manage.py install_search_index),
+# otherwise the in-process inverted index (logging an error on PostgreSQL, where the index is
+# expected); 'postgres' and 'python' force one backend.
+EDUCATION_SEARCH_BACKEND = os.environ.get('EDUCATION_SEARCH_BACKEND', 'auto')
+EDUCATION_SEARCH_CONFIG = os.environ.get('EDUCATION_SEARCH_CONFIG', 'english')
+EDUCATION_SEARCH_MAX_RESULTS = int(os.environ.get('EDUCATION_SEARCH_MAX_RESULTS', 50))
+
+# Education resource body settings (detail bodies are cached per last_updated, gzipped above the threshold)
+EDUCATION_BODY_CACHE_TIMEOUT = int(os.environ.get('EDUCATION_BODY_CACHE_TIMEOUT', 60 * 60 * 24))  # seconds
+EDUCATION_BODY_COMPRESS_MIN_BYTES = int(os.environ.get('EDUCATION_BODY_COMPRESS_MIN_BYTES', 2048))
+
+# Resource rating settings
+RESOURCE_RATINGS_PAGE_SIZE = int(os.environ.get('RESOURCE_RATINGS_PAGE_SIZE', 10))  # ratings embedded per detail response
+RESOURCE_RATINGS_MAX_PAGE_SIZE = int(os.environ.get('RESOURCE_RATINGS_MAX_PAGE_SIZE', 50))
+RATING_RECONCILE_BATCH_SIZE = int(os.environ.get('RATING_RECONCILE_BATCH_SIZE', 1000))
+
+# Learning path settings
+LEARNING_PATH_CACHE_TIMEOUT = int(os.environ.get('LEARNING_PATH_CACHE_TIMEOUT', 60 * 10))  # seconds
+
+# Quiz grading settings (answer keys are cached in CACHES and replaced when an edit commits;
+# point CACHES at a shared backend such as Redis, or other processes grade against their
+# own copy until it times out)
+QUIZ_ANSWER_KEY_CACHE_TIMEOUT = int(os.environ.get('QUIZ_ANSWER_KEY_CACHE_TIMEOUT', 60 * 60))  # seconds
+
+# Resource recommendation settings (item-item similarities are rebuilt nightly)
+RECOMMENDATION_NEIGHBORS = int(os.environ.get('RECOMMENDATION_NEIGHBORS', 50))  # stored per resource
+RECOMMENDATION_BLOCK_SIZE = int(os.environ.get('RECOMMENDATION_BLOCK_SIZE', 1000))  # resources per similarity block
+RECOMMENDATION_MAX_SEEDS = int(os.environ.get('RECOMMENDATION_MAX_SEEDS', 200))  # recent interactions used per user
+
+# Education engagement aggregation settings
+ENGAGEMENT_QUIZ_BATCH_SIZE = int(os.environ.get('ENGAGEMENT_QUIZ_BATCH_SIZE', 100))  # quizzes whose answers are loaded at once
+
+# Typeahead settings (in-process prefix index over resource, category and income stream names;
+# rebuilt in the background after TYPEAHEAD_MAX_AGE seconds so popularity weights follow view counts)
+TYPEAHEAD_MAX_AGE = float(os.environ.get('TYPEAHEAD_MAX_AGE', 300))  # seconds
+TYPEAHEAD_MAX_RESULTS = int(os.environ.get('TYPEAHEAD_MAX_RESULTS', 20))
+
+# Account archival settings (history of accounts deactivated longer than the grace period moves to cold storage)
+ACCOUNT_ARCHIVE_GRACE_DAYS = int(os.environ.get('ACCOUNT_ARCHIVE_GRACE_DAYS', 30))
+ACCOUNT_ARCHIVE_ROOT = os.environ.get('ACCOUNT_ARCHIVE_ROOT', os.path.join(BASE_DIR, 'archive', 'accounts'))
+ACCOUNT_ARCHIVE_BATCH_SIZE = int(os.environ.get('ACCOUNT_ARCHIVE_BATCH_SIZE', 5000))
+
+# Analytics report settings
+ANALYTICS_REPORT_CACHE_TIMEOUT = int(os.environ.get('ANALYTICS_REPORT_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Analytics warehouse (Parquet export) settings
+ANALYTICS_WAREHOUSE_ROOT = os.environ.get('ANALYTICS_WAREHOUSE_ROOT', os.path.join(BASE_DIR, 'warehouse'))
+ANALYTICS_WAREHOUSE_BATCH_SIZE = int(os.environ.get('ANALYTICS_WAREHOUSE_BATCH_SIZE', 50000))
+# Append-only rows are exported once they are this old, so transactions still
+# open when the export runs are not skipped; keep it above the longest write.
+ANALYTICS_WAREHOUSE_SETTLE_SECONDS = int(os.environ.get('ANALYTICS_WAREHOUSE_SETTLE_SECONDS', 60 * 10))
+
+# ROI percentile sketch settings
+ROI_SKETCH_K = int(os.environ.get('ROI_SKETCH_K', 200))
+ROI_SKETCH_RELOAD_INTERVAL = int(os.environ.get('ROI_SKETCH_RELOAD_INTERVAL', 300))  # seconds
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_LIFETIME', 60))),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_LIFETIME', 1))),
 }
 
+# API authentication mode
+# 'stateless': login/logout only issue and revoke JWTs and never touch the session table
+# 'session': additionally log the user in and out of a Django session
+API_AUTH_MODE = os.environ.get('API_AUTH_MODE', 'stateless')
+
+# Revoked refresh tokens ('cache' shares them via CACHES, so point CACHES at a shared backend
+# such as Redis; 'memory' is per process and only fits tests and single-process setups)
+JWT_DENYLIST_BACKEND = os.environ.get('JWT_DENYLIST_BACKEND', 'cache')
+JWT_DENYLIST_MAX_SIZE = int(os.environ.get('JWT_DENYLIST_MAX_SIZE', 100000))
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
 # Email settings (replace with your SMTP settings)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use 'django.core.mail.backends.locmem.EmailBackend' or '...filebased.EmailBackend' for testing.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.example.com')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', 'your_email@example.com')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', 'your_email_password')
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 30))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
+FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
+
+# Mail outbox settings
+MAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('MAIL_OUTBOX_BATCH_SIZE', 100))
+MAIL_OUTBOX_CLAIM_TIMEOUT = int(os.environ.get('MAIL_OUTBOX_CLAIM_TIMEOUT', 600))  # seconds
+MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 6))
+MAIL_RETRY_BASE_DELAY = int(os.environ.get('MAIL_RETRY_BASE_DELAY', 30))  # seconds, doubled per attempt
+
+# Earnings digest settings
+DIGEST_BATCH_SIZE = int(os.environ.get('DIGEST_BATCH_SIZE', 1000))
+
+# Earnings accrual settings
+EARNINGS_ACCRUAL_BATCH_SIZE = int(os.environ.get('EARNINGS_ACCRUAL_BATCH_SIZE', 1000))
+EARNINGS_RECONCILE_BATCH_SIZE = int(os.environ.get('EARNINGS_RECONCILE_BATCH_SIZE', 1000))
 
 # Logging configuration
 LOGGING = {
@@ -4,7 +4,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenObtainPairView
+from accounts.views import DenylistTokenRefreshView
 
 urlpatterns = [
     # Admin
@@ -26,7 +27,7 @@ urlpatterns = [
 
         # JWT Authentication
         path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-        path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+        path('token/refresh/', DenylistTokenRefreshView.as_view(), name='token_refresh'),
     ])),
 
     # Django CMS